@@ -1,100 +1,114 @@
-import pygame, random, os
-from enum import Enum
-from typing import List
+import time
+# Used to report how long importing everything took, which is a big part of starting the game.
+importStartTime = time.perf_counter()
+import pygame, argparse, itertools
+from enum import IntEnum
+from collections import deque
+from typing import Deque, List
+from snake_engine import TAIL_COLORS, makeEngine
+from snake_replay import Replay, ReplayRecorder
+from snake_profiler import FrameProfiler
+from snake_autopilot import Autopilot
+from snake_capture import FrameCapture, FORMATS
+from snake_renderers import NullRenderer, PygameRenderer
+from snake_assets import SpriteAtlas, getSpriteAtlas
+import snake_engine, snake_assets
+importSeconds = time.perf_counter() - importStartTime
 
 # Example of enum, including associating descriptive values to each member
 # Also, this is the first of many examples of basic docstrings.
-class Direction(Enum):
+class Direction(IntEnum):
     """
     An enum which defines movement directions.
-    The value for each enum is a unit vector in that direction (or (0,0) for STOPPED).
+    The value for each enum is the engine's direction code, a plain int, so it can be handed straight to the engine
+    and used to look up the change in x and y in snake_engine.DIRECTION_DELTAS.
     """
-    UP = pygame.Vector2(0,-1)
-    DOWN = pygame.Vector2(0,1)
-    RIGHT = pygame.Vector2(1,0)
-    LEFT = pygame.Vector2(-1,0)
-    STOPPED = pygame.Vector2(0,0)
+    UP = snake_engine.UP
+    DOWN = snake_engine.DOWN
+    RIGHT = snake_engine.RIGHT
+    LEFT = snake_engine.LEFT
+    STOPPED = snake_engine.STOPPED
+
+# The palette of colors a segment can be. Segments store an index into this list instead of a color name, and the
+# tile for each color is packed into the sprite atlas along with the apple.
+SPRITE_COLORS = ["red", *TAIL_COLORS]
+HEAD_COLOR_INDEX = 0
+
+def getAtlas() -> SpriteAtlas:
+    return getSpriteAtlas(SPRITE_COLORS)
+
+# The atlas and the area of it for each palette index, looked up once so drawing a sprite is just indexing a list.
+# Making the atlas only works out where each sprite goes; its surface is made the first time something is drawn.
+ATLAS = getAtlas()
+PALETTE_AREAS = [ATLAS.getArea(color) for color in SPRITE_COLORS]
+APPLE_AREA = ATLAS.getArea("apple")
 
 
 # Example of a base class.
 class Segment():
     """
-    A segment of the snake, represented by a colored rectangle.
+    A segment of the snake, represented by a colored square at cell (x, y) of the board.
+    Every segment is drawn from the same sprite atlas, using the area of the atlas that holds its color.
     """
 
-    def __init__(self, x, y, color, screen: pygame.surface.Surface):
-        self.position = pygame.Vector2(x,y)
-        self.color = color
-        self.screen = screen
+    # An example of __slots__. Objects normally keep their attributes in a dictionary, but a class with __slots__
+    # has room for exactly these attributes and no others, which makes each object much smaller. That adds up
+    # when the snake is thousands of segments long.
+    __slots__ = ("x", "y", "colorIndex")
 
-    def getRect(self):
-        return pygame.Rect(self.position, (20,20))
+    def __init__(self, x, y, colorIndex):
+        self.x = x
+        self.y = y
+        self.colorIndex = colorIndex
 
-    def draw(self):
-        pygame.draw.rect(self.screen, self.color, self.getRect())
+    def getRect(self):
+        return pygame.Rect(self.x*20, self.y*20, 20, 20)
 
-    def update(self):
-        pass
+    def draw(self, screen: pygame.surface.Surface):
+        screen.blit(ATLAS.surface, (self.x*20, self.y*20), PALETTE_AREAS[self.colorIndex])
 
 # Example of inheriting from a base class for more specific functionality.
 class Head(Segment):
     """
-    The front of the snake. Moves forward based on its current direction.
+    The front of the snake, drawn in red.
     """
 
-    def __init__(self, x, y, screen):
-        super().__init__(x, y, "red", screen)
-        self.direction: Direction = Direction.STOPPED
+    # Subclasses need their own (empty) __slots__, or they would get a dictionary after all.
+    __slots__ = ()
 
-    def update(self):
-        # An example of vector arithmetic
-        if self.direction is not None: self.position += self.direction.value *20
+    def __init__(self, x, y):
+        super().__init__(x, y, HEAD_COLOR_INDEX)
 
 # Another example of inheriting from the base class. Now we can do some cool polymorphism stuff!
 class TailSegment(Segment):
     """
-    A segment trailing behind the front of the snake. Follows the segment in front of it.
+    A segment trailing behind the front of the snake. tailColorIndex is the engine's index into TAIL_COLORS.
     """
 
-    # An example of a static class member.
-    tailColors = ['forestgreen','limegreen','darkgreen', 'green','springgreen',
-                  'greenyellow','lawngreen', 'palegreen','seagreen']
-
-    def __init__(self, following: Segment, screen):
-        # An example of randomly choosing an item from an iterable.
-        super().__init__(following.position.x, following.position.y,
-                         random.choice(TailSegment.tailColors), screen)
-        self.following = following
+    __slots__ = ()
 
-    def update(self):
-        # Great example of the importance of assigning by value vs. reference!
-        self.position = self.following.position.copy()
+    def __init__(self, x, y, tailColorIndex):
+        super().__init__(x, y, tailColorIndex + 1)
 
 
 # An example of a standalone class
-# This class also gives an example of loading, resizing, and displaying an image.
+# This class also gives an example of displaying an image. The image itself is loaded and resized by snake_assets.
 class Food():
     """
     The food for the snake. Appears randomly and increases the score and snake's length when collected.
     """
 
-    def __init__(self, screen: pygame.surface.Surface):
-        self.screen = screen
-        # An example of robust file access.
-        self.image = pygame.image.load(os.path.join(os.path.dirname(os.path.abspath(__file__)), "apple.gif"))
-        self.image = pygame.transform.scale(self.image, (20, 20))
-        self.move()
+    __slots__ = ("x", "y")
 
-    def getRect(self):
-        return pygame.Rect(self.position, (20,20))
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
 
-    def move(self):
-        # An example of randomly generating numbers.
-        self.position = pygame.Vector2(random.randint(0, self.screen.get_width()/20-1)*20,
-                                       random.randint(0, self.screen.get_height()/20-1)*20)
+    def getRect(self):
+        return pygame.Rect(self.x*20, self.y*20, 20, 20)
 
-    def draw(self):
-        self.screen.blit(self.image, self.position)
+    def draw(self, screen: pygame.surface.Surface):
+        screen.blit(ATLAS.surface, (self.x*20, self.y*20), APPLE_AREA)
 
 
 # Another example of a standalone class
@@ -106,119 +120,511 @@ class Score():
     def __init__(self, screen: pygame.surface.Surface):
         self.score = 0
         self.highScore = 0
-        self.position = pygame.Vector2(300, 10)
-        self.font = pygame.font.Font(None, 24)
+        self.position = pygame.Vector2(screen.get_width()/2, 10)
+        # The font is loaded the first time the score is drawn, so it doesn't slow down starting the game.
+        self.font = None
+        self.fontLoadSeconds = 0
         self.screen = screen
-
-    def increase(self, increase = 1):
-        self.score += increase
-        if self.score > self.highScore: self.highScore = self.score
-
-    def reset(self):
-        self.score = 0
+        # The text is only rendered again when the scores it shows have changed.
+        self.text = None
+        self.textScores = None
+        # The area covered by the text the last time it was drawn.
+        self.rect = pygame.Rect(self.position, (0,0))
+
+    def loadFont(self):
+        startTime = time.perf_counter()
+        pygame.font.init()
+        self.font = pygame.font.Font(None, 24)
+        self.fontLoadSeconds = time.perf_counter() - startTime
 
     def draw(self):
-        # An example of formatted strings.
-        text = self.font.render(f"Score: {self.score}   High Score: {self.highScore}", True, "white")
-        self.screen.blit(text, text.get_rect(center = self.position))
+        if self.font is None: self.loadFont()
+        if self.textScores != (self.score, self.highScore):
+            # An example of formatted strings.
+            self.text = self.font.render(f"Score: {self.score}   High Score: {self.highScore}", True, "white")
+            self.textScores = (self.score, self.highScore)
+            self.rect = self.text.get_rect(center = self.position)
+        self.screen.blit(self.text, self.rect)
 
 # An example of access-hierarchy. The above classes do not communicate with one another,
 # but instead communicate through this main class.
 class SnakeGame:
     """
-    The main class for the snake game. Handles interactions between each of the game objects defined above and
-    controls the overall flow of the game.
+    The main class for the snake game. Passes keyboard input to the SnakeEngine, which holds the rules of the game,
+    and draws the engine's current state to the screen.
+    If dirtyRendering is True, only the parts of the screen that changed are redrawn and sent to the display.
+    Input is checked and the screen is updated at displayRate frames per second, while the engine moves forward
+    gameSpeed times per second, no matter how fast or slow the display is.
+    If a replay is given, its actions are used instead of the keyboard, sped up by replaySpeed. If recordPath is
+    given, the game is saved there as a replay when the window is closed.
+    If a profiler is given, each phase of every frame is timed, and the results are saved when the game ends.
+    If autopilotBudget is given, the snake steers itself instead of listening to the keyboard, planning for at most
+    that many microseconds each tick.
+    Boards wider or taller than viewportSize cells (or maxWindowCells, if no viewportSize is given) are shown
+    through a camera that follows the head, and only the cells the camera can see are drawn.
+    If a capture is given, every frame is handed to it after being shown, to be saved in the background.
+    Frames are drawn through a renderer. The "pygame" renderer draws once every renderEvery ticks, and the "null"
+    renderer draws nothing, so the whole game can run without drawing, such as in a soak test.
     """
 
-    def __init__(self):
-
-        pygame.init()
-        self.screen = pygame.display.set_mode((600, 600))
+    # How many turns the player can press ahead of the snake. Each one is used on its own tick.
+    maxQueuedTurns = 3
+    # If the game falls this many ticks behind, it gives up on catching up rather than freezing the display. When the
+    # game is fast enough to need more than one tick every frame, such as a sped-up replay, the limit is this many
+    # frames' worth of ticks instead.
+    maxTicksPerFrame = 5
+    # Boards bigger than this are shown through a camera unless a viewport size is given.
+    maxWindowCells = 40
+    defaultViewportCells = 30
+    renderers = ["pygame", "null"]
+
+    # An example of a dictionary, used here to translate between two ways of naming the same thing.
+    keyDirections = {pygame.K_w: Direction.UP, pygame.K_s: Direction.DOWN,
+                     pygame.K_d: Direction.RIGHT, pygame.K_a: Direction.LEFT}
+
+    def __init__(self, seed = None, dirtyRendering = False, displayRate = 60,
+                 replay: Replay = None, replaySpeed = 1, recordPath = None, width = 30, height = 30,
+                 profiler: FrameProfiler = None, autopilotBudget = None, viewportSize = None,
+                 capture: FrameCapture = None, renderer = "pygame", renderEvery = 1):
+
+        if replay is not None: width, height, seed = (replay.width, replay.height, replay.seed)
+        if renderer not in SnakeGame.renderers:
+            raise ValueError(f"The renderer must be one of {SnakeGame.renderers}, not {renderer!r}.")
+
+        # How long each part of starting the game took, in seconds. The rest is added by the first frame.
+        self.startupTimes = {"imports": importSeconds}
+        startTime = time.perf_counter()
+        # pygame.init() would also start the sound, joystick and other modules the game never uses.
+        # Only the display is started here. The font module is started when the score is first drawn.
+        pygame.display.init()
+        if viewportSize is None and max(width, height) > SnakeGame.maxWindowCells:
+            viewportSize = SnakeGame.defaultViewportCells
+        if viewportSize is not None and max(width, height) > viewportSize:
+            # The part of the board the window shows, in board pixels.
+            self.camera = pygame.Rect(0, 0, min(width, viewportSize)*20, min(height, viewportSize)*20)
+            self.screen = pygame.display.set_mode(self.camera.size)
+        else:
+            self.camera = None
+            self.screen = pygame.display.set_mode((width*20, height*20))
         self.clock = pygame.time.Clock()
+        startTime = self.recordStartupTime("display", startTime)
 
-        self.head = Head(300,300, self.screen)
-        # An example of polymorphism, with type hints thrown in as a bonus!
-        self.segments: List[Segment] = [self.head]
-        self.food = Food(self.screen)
+        self.engine = makeEngine(width, height, seed)
+        self.head = Head(self.engine.headX, self.engine.headY)
+        # The segments behind the head, in the same order as the engine's body.
+        self.tail: Deque[TailSegment] = deque()
+        self.food = Food(*self.engine.getCellPosition(self.engine.food))
         self.score = Score(self.screen)
-        self.gameSpeed = 2
+
+        self.dirtyRendering = dirtyRendering
+        # The areas of the screen that need to be sent to the display this frame. None means the whole screen.
+        self.dirtyRects: List[pygame.Rect] = None
+        # The tail segments that moved or changed color since the last frame, which dirty rendering draws again.
+        self.changedSegments: List[TailSegment] = []
+        # How many pixels were sent to the display on the last frame, and over every frame so far.
+        self.pixelsDrawn = 0
+        self.totalPixelsDrawn = 0
+        self.framesDrawn = 0
+
+        self.displayRate = displayRate
+        # Turns waiting to be used, each stored with the time its key was pressed.
+        self.turnQueue: Deque[tuple] = deque()
+        # How long, in seconds, recent turns waited between the key press and the snake actually turning.
+        self.inputLatencies: Deque[float] = deque(maxlen = 1000)
+
+        self.replayActions = None if replay is None else replay.getActions()
+        self.replaySpeed = replaySpeed
+        self.recordPath = recordPath
+        self.recorder = None if recordPath is None else ReplayRecorder(self.engine)
+
+        self.profiler = profiler
+        self.autopilot = None if autopilotBudget is None else Autopilot(self.engine, autopilotBudget)
+        self.capture = capture
+        if renderer == "null": self.renderer = NullRenderer(width, height, renderEvery)
+        else: self.renderer = PygameRenderer(width, height, renderEvery, self)
+        self.updateCamera()
+        self.recordStartupTime("game objects", startTime)
+
+    def recordStartupTime(self, name, startTime):
+        currentTime = time.perf_counter()
+        self.startupTimes[name] = currentTime - startTime
+        return currentTime
+
+    @property
+    def gameSpeed(self):
+        if self.replayActions is not None: return self.engine.gameSpeed*self.replaySpeed
+        return self.engine.gameSpeed
+
+    def getPixelPosition(self, cell):
+        x, y = self.engine.getCellPosition(cell)
+        return (x*20, y*20)
 
     # Lots of examples of modular design and isolating functionality here. I won't highlight them all.
     def checkEvents(self):
-        
-        newDirection = None
+        """
+        Adds any turns the player pressed to the end of the turn queue.
+        """
 
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 self.running = False
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_w and self.head.direction != Direction.DOWN:
-                    newDirection = Direction.UP
-                elif event.key == pygame.K_s and self.head.direction != Direction.UP:
-                    newDirection = Direction.DOWN
-                elif event.key == pygame.K_d and self.head.direction != Direction.LEFT:
-                    newDirection = Direction.RIGHT
-                elif event.key == pygame.K_a and self.head.direction != Direction.RIGHT:
-                    newDirection = Direction.LEFT
-
-        if newDirection is not None: self.head.direction = newDirection
-
-    def isHeadOutOfBounds(self):
-        # An example of a more complex conditional statment.
-        return (self.head.position.x >= self.screen.get_width() or self.head.position.x < 0 or
-                self.head.position.y >= self.screen.get_height() or self.head.position.y < 0)
-
-    def isHeadOverlappingTail(self):
-        # An example of list comprehension.
-        return self.head.getRect().collidelist([segment.getRect() for segment in self.segments[1:]]) != -1
-
-    def checkForGameOver(self):
-        if self.isHeadOutOfBounds() or self.isHeadOverlappingTail():
-            self.head.position = pygame.Vector2(300,300)
-            self.head.direction = Direction.STOPPED
-            self.segments = [self.head]
-            self.score.reset()
-            self.gameSpeed = 2
-            return True
-        else: return False
-
-    def checkForFood(self):
-        if self.head.getRect().colliderect(self.food.getRect()):
-            self.food.move()
-            self.score.increase()
-            self.gameSpeed += 0.5
-            self.segments.append(TailSegment(self.segments[-1], self.screen))
+            if event.type == pygame.KEYDOWN and self.replayActions is None and self.autopilot is None:
+                newDirection = SnakeGame.keyDirections.get(event.key)
+                # The engine only needs the plain int code.
+                if newDirection is not None: self.queueTurn(int(newDirection))
+
+    def queueTurn(self, direction):
+        """
+        Adds a turn to the queue, unless it wouldn't change anything or would reverse the turn before it.
+        """
+        if self.turnQueue: previousDirection = self.turnQueue[-1][0]
+        else: previousDirection = self.engine.direction
+        if (len(self.turnQueue) < SnakeGame.maxQueuedTurns and direction != previousDirection
+            and direction != snake_engine.OPPOSITE_DIRECTIONS[previousDirection]):
+            self.turnQueue.append((direction, time.perf_counter()))
+
+    def tick(self):
+        """
+        Moves the game forward by one tick, using the next turn in the queue if there is one. Returns True if the
+        snake died.
+        """
+        action = None
+        if self.replayActions is not None:
+            # An example of catching an exception. The replay is over once it runs out of actions.
+            try: action = next(self.replayActions)
+            except StopIteration:
+                self.running = False
+                return False
+        elif self.autopilot is not None:
+            action = self.autopilot.getAction()
+        elif self.turnQueue:
+            action, pressTime = self.turnQueue.popleft()
+            self.inputLatencies.append(time.perf_counter() - pressTime)
+
+        if self.recorder is not None: self.recorder.record(action)
+        # Checking for a profiler before every phase costs almost nothing when there isn't one.
+        profiler = self.profiler
+        if profiler: startTime = time.perf_counter_ns()
+        state, reward, gameOver = self.engine.step(action)
+        if profiler: startTime = profiler.record("step", startTime)
+        if gameOver: self.turnQueue.clear()
+        self.updateSegments(reward, gameOver)
+        if profiler: profiler.record("segments", startTime)
+        return gameOver
+
+    def syncSegments(self):
+        """
+        Rebuilds every drawable object from the engine's state, for when the engine was changed directly.
+        """
+        engine = self.engine
+        self.head.x = engine.headX
+        self.head.y = engine.headY
+        self.tail = deque(TailSegment(*engine.getCellPosition(cell), colorIndex)
+                          for cell, colorIndex in zip(itertools.islice(engine.body, 1, None), engine.tailColors))
+        self.food.x, self.food.y = engine.getCellPosition(engine.food)
+        self.score.score = engine.score
+        self.score.highScore = engine.highScore
+        self.updateCamera()
+        self.dirtyRects = None
+
+    def snapshot(self):
+        """
+        Returns the state of the game, which restore() can go back to. See SnakeEngine.snapshot.
+        """
+        return self.engine.snapshot()
+
+    def restore(self, snapshot):
+        self.engine.restore(snapshot)
+        self.syncSegments()
+
+    def updateCamera(self):
+        """
+        Centers the camera on the head, without letting it go past the edges of the board.
+        """
+        if self.camera is None: return
+        camera = self.camera
+        camera.left = max(0, min(self.head.x*20 - camera.width//40*20, self.engine.width*20 - camera.width))
+        camera.top = max(0, min(self.head.y*20 - camera.height//40*20, self.engine.height*20 - camera.height))
+
+    def markDirty(self, rect: pygame.Rect):
+        if self.dirtyRects is not None: self.dirtyRects.append(rect)
+
+    def recolorTail(self):
+        """
+        Colors belong to places in the tail rather than to segments, like in the original game, so as segments move
+        up, each one takes the color of its new place. This is only done when a frame is drawn, which has to go over
+        the whole tail anyway, so a tick costs the same however long the snake is. Returns the segments whose color
+        changed, which are the only ones dirty rendering has to draw again.
+        """
+        recoloredSegments = []
+        for segment, tailColorIndex in zip(self.tail, self.engine.tailColors):
+            # Tail colors come right after the head's color in the palette.
+            if segment.colorIndex != tailColorIndex + 1:
+                segment.colorIndex = tailColorIndex + 1
+                recoloredSegments.append(segment)
+        return recoloredSegments
+
+    def updateSegments(self, reward, gameOver):
+        """
+        Moves the drawable objects to match what happened in the engine on the last tick, and keeps track of which
+        areas of the screen changed.
+        """
+        engine = self.engine
+        head = self.head
+
+        if gameOver:
+            head.x = engine.headX
+            head.y = engine.headY
+            self.tail.clear()
+            self.dirtyRects = None
+
+        elif head.x != engine.headX or head.y != engine.headY:
+            # Just like the engine, the last tail segment moves to where the head used to be.
+            if engine.freedCell != -1 and self.dirtyRects is not None:
+                self.markDirty(pygame.Rect(self.getPixelPosition(engine.freedCell), (20,20)))
+            if self.tail:
+                segment = self.tail.pop()
+                segment.x = head.x
+                segment.y = head.y
+                self.tail.appendleft(segment)
+                if self.dirtyRects is not None:
+                    self.markDirty(segment.getRect())
+                    self.changedSegments.append(segment)
+            head.x = engine.headX
+            head.y = engine.headY
+            if self.dirtyRects is not None: self.markDirty(head.getRect())
+
+        if reward > 0:
+            # The new segment waits on top of the end of the snake until the next move.
+            end = self.tail[-1] if self.tail else head
+            self.tail.append(TailSegment(end.x, end.y, engine.tailColors[-1]))
+            self.dirtyRects = None
+
+        self.food.x, self.food.y = engine.getCellPosition(engine.food)
+        self.score.score = engine.score
+        self.score.highScore = engine.highScore
+        self.updateCamera()
 
     def drawScreen(self):
+        if self.camera is not None:
+            self.drawViewport()
+            return
+        self.recolorTail()
+        self.screen.fill("black")
+        # Drawing from the end of the tail forward keeps a brand new segment hidden under the one it is waiting on.
+        # All of the tail is drawn with a single call, which is much faster than one call per segment.
+        atlasSurface = ATLAS.surface
+        areas = PALETTE_AREAS
+        self.screen.blits([(atlasSurface, (segment.x*20, segment.y*20), areas[segment.colorIndex])
+                           for segment in reversed(self.tail)], False)
+        self.head.draw(self.screen)
+        self.food.draw(self.screen)
+        self.score.draw()
+        if self.profiler and self.profiler.showOverlay: self.profiler.drawOverlay(self.screen)
+
+    def drawViewport(self):
+        """
+        Draws only what the camera can see. Every sprite lines up with the cells, and so does the camera, so a
+        sprite is on screen exactly when its cell is inside the camera's cells.
+        """
+        self.recolorTail()
         self.screen.fill("black")
-        for segment in self.segments[::-1]:
-            segment.draw()
-        self.food.draw()
+        left = self.camera.left//20
+        top = self.camera.top//20
+        right = self.camera.right//20
+        bottom = self.camera.bottom//20
+        atlasSurface = ATLAS.surface
+        areas = PALETTE_AREAS
+        self.screen.blits([(atlasSurface, ((segment.x - left)*20, (segment.y - top)*20), areas[segment.colorIndex])
+                           for segment in reversed(self.tail)
+                           if left <= segment.x < right and top <= segment.y < bottom], False)
+        head, food = self.head, self.food
+        if left <= head.x < right and top <= head.y < bottom:
+            self.screen.blit(atlasSurface, ((head.x - left)*20, (head.y - top)*20), areas[head.colorIndex])
+        if left <= food.x < right and top <= food.y < bottom:
+            self.screen.blit(atlasSurface, ((food.x - left)*20, (food.y - top)*20), APPLE_AREA)
         self.score.draw()
+        if self.profiler and self.profiler.showOverlay: self.profiler.drawOverlay(self.screen)
+
+    def drawDirtyRects(self):
+        """
+        Redraws only the changed areas of the screen, in the same order as drawScreen. Between two frames, the only
+        segments that change are the head, the tail segments that moved up behind it, and the segments that took a
+        new color. Only one segment moves each tick, but several ticks can go by between frames.
+        """
+        recoloredSegments = self.recolorTail()
+        self.dirtyRects.extend(segment.getRect() for segment in recoloredSegments)
+        if not self.dirtyRects: return
+        for rect in self.dirtyRects: self.screen.fill("black", rect)
+        for segment in self.changedSegments: segment.draw(self.screen)
+        for segment in recoloredSegments: segment.draw(self.screen)
+        self.head.draw(self.screen)
+        if self.food.getRect().collidelist(self.dirtyRects) != -1: self.food.draw(self.screen)
+        # The score is drawn on top of the board. Where a cell under it was redrawn, the text has to be drawn
+        # again, but only inside that cell, or the edges of the letters would be blended twice. The same cell can be
+        # marked more than once in a frame, so each cell is only drawn once.
+        for rect in {tuple(rect) for rect in self.dirtyRects if rect.colliderect(self.score.rect)}:
+            self.screen.set_clip(rect)
+            self.score.draw()
+        self.screen.set_clip(None)
+
+    def updateDisplay(self):
+        profiler = self.profiler
+        if profiler: startTime = time.perf_counter_ns()
+        # The profiler overlay changes every frame, and the camera moves with the head, so either one needs the whole
+        # screen to be redrawn.
+        if (self.dirtyRendering and self.dirtyRects is not None and self.camera is None
+            and not (profiler and profiler.showOverlay)):
+            self.drawDirtyRects()
+            if profiler: startTime = profiler.record("draw", startTime)
+            pygame.display.update(self.dirtyRects)
+            self.pixelsDrawn = sum(rect.width*rect.height for rect in self.dirtyRects)
+        else:
+            self.drawScreen()
+            if profiler: startTime = profiler.record("draw", startTime)
+            pygame.display.flip()
+            self.pixelsDrawn = self.screen.get_width()*self.screen.get_height()
+        self.totalPixelsDrawn += self.pixelsDrawn
+        self.framesDrawn += 1
+        if self.capture is not None: self.capture.capture(self.screen)
+        if profiler: profiler.record("display", startTime)
+        # Without dirty rendering, nothing needs to know what changed, so the ticks until the next frame skip it.
+        self.dirtyRects = [] if self.dirtyRendering else None
+        self.changedSegments.clear()
+
+    def getLatencyReport(self):
+        if not self.inputLatencies: return "No turns were made."
+        averageLatency = sum(self.inputLatencies)/len(self.inputLatencies)
+        return (f"Input-to-move latency over the last {len(self.inputLatencies)} turns: "
+                f"average {averageLatency*1000:.1f} ms, worst {max(self.inputLatencies)*1000:.1f} ms")
+
+    def getDrawReport(self):
+        """
+        Reports how much of the screen was sent to the display per frame, which shows how much dirty rendering saved.
+        """
+        if self.framesDrawn == 0: return "No frames were drawn."
+        averagePixels = self.totalPixelsDrawn/self.framesDrawn
+        return (f"Sent {self.totalPixelsDrawn:,} pixels to the display over {self.framesDrawn:,} frames: "
+                f"{averagePixels:,.0f} per frame, "
+                f"{averagePixels/(self.screen.get_width()*self.screen.get_height())*100:.1f}% of the screen")
+
+    def getStartupReport(self):
+        total = sum(self.startupTimes.values())
+        return (f"Started in {total*1000:.1f} ms: " +
+                ", ".join(f"{name} {seconds*1000:.1f} ms" for name, seconds in self.startupTimes.items()))
+
+    def start(self):
+        """
+        Draws the first frame and prints how long starting the game took.
+        """
+        self.running = True
+        # The first frame is where the images and font are loaded, so it counts as part of starting up.
+        assetLoadSecondsBefore = snake_assets.assetLoadSeconds
+        startTime = time.perf_counter()
+        self.renderer.draw(self.engine)
+        firstFrameSeconds = time.perf_counter() - startTime
+        self.startupTimes["assets"] = snake_assets.assetLoadSeconds - assetLoadSecondsBefore
+        self.startupTimes["font"] = self.score.fontLoadSeconds
+        self.startupTimes["first frame"] = firstFrameSeconds - self.startupTimes["assets"] - self.startupTimes["font"]
+        print(self.getStartupReport())
+
+    def runFrame(self, ticks):
+        """
+        Checks for input, moves the game forward ticks ticks, and draws the result. Returns True if a game ended.
+        """
+        if self.profiler: startTime = time.perf_counter_ns()
+        self.checkEvents()
+        if self.profiler: self.profiler.record("events", startTime)
+
+        gameOver = False
+        for _ in range(ticks):
+            if self.tick(): gameOver = True
+        # Nothing on the screen changes between ticks, so there is only something new to show after one.
+        if ticks > 0: self.renderer.render(self.engine, ticks)
+        return gameOver
+
+    def finish(self):
+        """
+        Saves the recording, capture and profile, if there are any, prints how the game went, and closes the window.
+        """
+        if self.recorder is not None: self.recorder.finish().save(self.recordPath)
+        if self.capture is not None:
+            self.capture.close()
+            print(self.capture.getReport())
+        if self.autopilot is not None: print(self.autopilot.getReport())
+        elif self.replayActions is None: print(self.getLatencyReport())
+        print(self.getDrawReport())
+        if self.profiler:
+            self.profiler.save()
+            print(f"Saved frame timings to {self.profiler.outputPath}.json and {self.profiler.outputPath}.csv")
+        pygame.quit()
 
     def play(self):
 
-        self.running = True
+        self.start()
+        # How much time has passed that the engine hasn't caught up to yet.
+        unsimulatedTime = 0
+        previousTime = time.perf_counter()
 
         # An example of a while loop.
         while self.running:
 
-            self.checkEvents()
+            currentTime = time.perf_counter()
+            unsimulatedTime += currentTime - previousTime
+            previousTime = currentTime
 
-            # An example of a for loop.
-            for segment in self.segments[::-1]:
-                segment.update()
+            # Each tick uses up 1/gameSpeed seconds of the time that has passed.
+            ticks = int(unsimulatedTime*self.gameSpeed)
+            # A display rate of 0 doesn't limit the frame rate, so there is no telling how many ticks a frame needs.
+            maxTicks = SnakeGame.maxTicksPerFrame
+            if self.displayRate > 0: maxTicks = max(maxTicks, int(maxTicks*self.gameSpeed/self.displayRate))
+            if ticks >= maxTicks:
+                ticks = maxTicks
+                unsimulatedTime = 0
+            else: unsimulatedTime -= ticks/self.gameSpeed
 
-            gameOver = self.checkForGameOver()
-            if not gameOver: self.checkForFood()
+            self.runFrame(ticks)
+            self.clock.tick(self.displayRate)
 
-            self.drawScreen()
-
-            pygame.display.flip()
-            self.clock.tick(self.gameSpeed)
-            
-        pygame.quit()
+        self.finish()
 
 
 # An example of protecting main functionality from imports
-if __name__ == "__main__": SnakeGame().play()
\ No newline at end of file
+if __name__ == "__main__":
+    # An example of reading options from the command line.
+    parser = argparse.ArgumentParser(description = "Play the snake game.")
+    parser.add_argument("--dirty-rendering", action = "store_true",
+                        help = "Only redraw the parts of the screen that changed each frame.")
+    parser.add_argument("--display-rate", type = int, default = 60,
+                        help = "How many times per second to check for input and update the screen.")
+    parser.add_argument("--seed", type = int, help = "The seed for food positions and tail colors.")
+    parser.add_argument("--width", type = int, default = 30, help = "The board width, in cells (up to 10,000).")
+    parser.add_argument("--height", type = int, default = 30, help = "The board height, in cells (up to 10,000).")
+    parser.add_argument("--viewport", type = int,
+                        help = "Show this many cells across and follow the head with a camera. Boards bigger than "
+                               f"{SnakeGame.maxWindowCells} cells use {SnakeGame.defaultViewportCells} by default.")
+    parser.add_argument("--record", help = "Save the game as a replay file with this name.")
+    parser.add_argument("--profile", nargs = "?", const = "snake_profile",
+                        help = "Time each phase of every frame and save the results to PROFILE.json and PROFILE.csv. "
+                               "Can also be turned on by setting the SNAKE_PROFILE environment variable.")
+    parser.add_argument("--profile-overlay", action = "store_true",
+                        help = "Show the profiler's timings on the screen while playing.")
+    parser.add_argument("--autopilot", nargs = "?", type = int, const = 2000, metavar = "BUDGET",
+                        help = "Let the snake steer itself, planning for at most BUDGET microseconds each tick.")
+    parser.add_argument("--capture", metavar = "OUTPUT",
+                        help = "Save every frame to the OUTPUT folder (or file, for raw frames) in the background.")
+    parser.add_argument("--capture-format", choices = FORMATS, default = "png", help = "How to save captured frames.")
+    parser.add_argument("--renderer", choices = SnakeGame.renderers, default = "pygame",
+                        help = "How to draw the game. The null renderer draws nothing.")
+    parser.add_argument("--render-every", type = int, default = 1, metavar = "N", help = "Only draw every Nth tick.")
+    arguments = parser.parse_args()
+
+    profiler = FrameProfiler.fromEnvironment()
+    if arguments.profile is not None or arguments.profile_overlay:
+        profiler = FrameProfiler(arguments.profile or "snake_profile", arguments.profile_overlay)
+    SnakeGame(seed = arguments.seed, dirtyRendering = arguments.dirty_rendering,
+              displayRate = arguments.display_rate, recordPath = arguments.record, profiler = profiler,
+              autopilotBudget = arguments.autopilot, width = arguments.width, height = arguments.height,
+              viewportSize = arguments.viewport, renderer = arguments.renderer, renderEvery = arguments.render_every,
+              capture = None if arguments.capture is None else FrameCapture(arguments.capture,
+                                                                            arguments.capture_format)).play()
@@ -1,6 +1,11 @@
 import turtle, math, random, time
+from collections import deque
+from snake_assets import getAssetPath
 
-segments = []
+segments = deque()
+# The color of each place in the tail, from the front. Colors stay in their places as the snake moves, the same as
+# in the pygame versions.
+segment_colors = deque()
 score = 0
 high_score = 0
 frame_rate = 10
@@ -15,6 +20,8 @@ wn.title('Snake Game')
 wn.bgcolor('black')
 wn.setup(width=600, height=600)
 wn.delay(0)
+# Turn off automatic drawing. We draw everything at once with wn.update() at the end of each frame.
+wn.tracer(0)
 
 head = turtle.Turtle()
 head.speed(0)
@@ -27,7 +34,8 @@ head_velocity = 20
 
 # Snake food: Apple 
 food = turtle.Turtle()
-apple_file_path = "apple.gif"
+# The full path works no matter what folder the game was started from.
+apple_file_path = getAssetPath("apple.gif")
 wn.register_shape(apple_file_path)
 food.shape(apple_file_path)
 food.penup()
@@ -83,6 +91,97 @@ def distance(t1, t2):
     dist = math.sqrt((t1_x-t2_x)*(t1_x-t2_x) + (t1_y-t2_y)*(t1_y-t2_y))
     return dist
 
+# How many tail segments are at each position. This lets us check if the head ran into the tail
+# without looping over every segment.
+occupied_positions = {}
+
+# Every position on the board, and the ones with no tail segment on them. Keeping the free positions in a list
+# lets us pick one at random for the food without looking through the whole board. free_position_indices says
+# where each free position is in free_positions, so one can be taken out of the list without searching for it.
+board_positions = [(x, y) for x in range(-280, 281, head_velocity) for y in range(-280, 281, head_velocity)]
+free_positions = list(board_positions)
+free_position_indices = {position: index for index, position in enumerate(free_positions)}
+
+def get_position_key(t):
+    return (round(t.xcor()), round(t.ycor()))
+
+def swap_free_positions(index1, index2):
+    position1, position2 = free_positions[index1], free_positions[index2]
+    free_positions[index1], free_positions[index2] = position2, position1
+    free_position_indices[position2] = index1
+    free_position_indices[position1] = index2
+
+def add_occupied(position):
+    occupied_positions[position] = occupied_positions.get(position, 0) + 1
+    if occupied_positions[position] == 1:
+        # Fill the hole left in the list of free positions with the last free position.
+        swap_free_positions(free_position_indices[position], len(free_positions) - 1)
+        free_positions.pop()
+        del free_position_indices[position]
+
+def remove_occupied(position):
+    occupied_positions[position] -= 1
+    if occupied_positions[position] == 0:
+        del occupied_positions[position]
+        free_position_indices[position] = len(free_positions)
+        free_positions.append(position)
+
+# Segments from earlier games are hidden and kept here, so they can be reused instead of making new turtles.
+segment_pool = []
+
+def get_segment():
+    if len(segment_pool) > 0:
+        new_segment = segment_pool.pop()
+        new_segment.showturtle()
+    else:
+        new_segment = turtle.Turtle()
+        new_segment.speed(0)
+        new_segment.shape('square')
+        new_segment.penup()
+        new_segment.tail_color = None
+    return new_segment
+
+def recolor_segments():
+    # When the last segment jumps to the front, every segment moves up one place, so each one takes the color of
+    # its new place. This is done once a frame, and only for segments whose color changed. wn.update() goes over
+    # every turtle anyway, so this doesn't make a frame much slower.
+    for segment, color in zip(segments, segment_colors):
+        if segment.tail_color != color:
+            segment.color(color)
+            segment.tail_color = color
+
+def release_segments():
+    for segment in segments:
+        segment.hideturtle()
+        segment_pool.append(segment)
+    segments.clear()
+    segment_colors.clear()
+    occupied_positions.clear()
+    free_positions[:] = board_positions
+    free_position_indices.clear()
+    free_position_indices.update((position, index) for index, position in enumerate(free_positions))
+
+def get_new_food_position():
+    # Pick from the list of free positions, which takes the same time however full the board is. The head isn't
+    # counted in occupied_positions, so if it's on a free position, we move that one to the end of the list and
+    # leave it out of the pick.
+    free_count = len(free_positions)
+    head_position = get_position_key(head)
+    if head_position in free_position_indices:
+        swap_free_positions(free_position_indices[head_position], free_count - 1)
+        free_count -= 1
+    # The snake has filled the whole board, so there is nowhere left to put food.
+    if free_count == 0: return None
+    return free_positions[random.randrange(free_count)]
+
+def place_food():
+    position = get_new_food_position()
+    if position is None:
+        food.hideturtle()
+    else:
+        food.goto(position)
+        food.showturtle()
+
 def move(): 
     if head.direction == 'up':
           y = head.ycor()
@@ -109,47 +208,44 @@ def updateGame():
     if head.xcor() > 290 or head.xcor() < -290 or head.ycor() > 290 or head.ycor() < -290:
           head.goto(0, 0)
           head.direction = 'stop'
-          for segment in segments:
-            segment.goto(1000, 1000)
-          segments.clear()
+          release_segments()
+          # If the last game filled the board, the food was hidden, so put it back.
+          if not food.isvisible(): place_food()
           score = 0
           pen.clear()
           pen.write('Score: {} High Score: {}'.format(score, high_score), align='center', font=24)
 
     #1) What's the last thing that is missing to this game? It looks like we have everything down, but what if we have a very looong snake. What would be the wrong move? We don't want to have tail to collide into itself. What have we been using to go through all of the segments? 
-    #2) We have been using a for loop to go through each of the segments of the tail. Lets create a for loop like so: 
-    for segment in segments:
-        if segment.distance(head) < 2:
-            time.sleep(1)
-            head.goto(0,0)
-            head.direction = 'stop'
-            for segment in segments:
-                segment.goto(1000, 1000)
-            segments.clear()
-            score = 0
-            pen.clear()
-            pen.write('Score: {} High Score: {}'.format(score, high_score), align='center', font=24)
+    #2) We could use a for loop to go through each of the segments of the tail, but that gets slow for a long snake. Instead, we look up the head's position in occupied_positions: 
+    if get_position_key(head) in occupied_positions:
+        time.sleep(1)
+        head.goto(0,0)
+        head.direction = 'stop'
+        release_segments()
+        # If the last game filled the board, the food was hidden, so put it back.
+        if not food.isvisible(): place_food()
+        score = 0
+        pen.clear()
+        pen.write('Score: {} High Score: {}'.format(score, high_score), align='center', font=24)
 
       #We can get the distance between a segment of the tail from the head of the snake. We can use the same unit as the other distance check. Turtle has a built in one for this case: 
           #We set all of the defaults as we have done in the past before! We do this with the following lines. Do these lines look familar? 
       # Now lets run it! Congratulations, we have finished the snake game! 
       # Maybe we want to do some customizations......
 
-    if distance(head, food) < 20:
-        x = random.randint(-290,290)
-        y = random.randint(-290,290)
-
+    if food.isvisible() and distance(head, food) < 20:
         #wn.delay(1)
-        food.goto(x,y)
+        place_food()
         #wn.delay(0)
-        new_segment = turtle.Turtle()
-        new_segment.speed(0)
-        new_segment.shape('square')
-        new_segment.color(colors[c])
+        new_segment = get_segment()
+        segment_colors.append(colors[c])
         c = c + 1
         if c == n_color:
           c = 0
-        new_segment.penup()
+        # Start the new segment on top of the end of the snake so it can be counted as occupied right away.
+        if len(segments) > 0: new_segment.goto(segments[-1].position())
+        else: new_segment.goto(head.position())
+        add_occupied(get_position_key(new_segment))
         segments.append(new_segment)
 
         score = score + 1
@@ -159,17 +255,17 @@ def updateGame():
         pen.write('Score: {} High Score: {}'.format(score, high_score), align='center', font=24)
 
     if head.direction != "stop":
-        for index in range(len(segments)-1, 0, -1):
-            x = segments[index-1].xcor()
-            y = segments[index-1].ycor()
-            segments[index].goto(x, y)
-
+        # Instead of moving every segment up one spot, we move the last segment to the head's old spot.
         if len(segments) > 0:
-            x = head.xcor()
-            y = head.ycor()
-            segments[0].goto(x, y)
+            remove_occupied(get_position_key(segments[-1]))
+            add_occupied(get_position_key(head))
+            last_segment = segments.pop()
+            last_segment.goto(head.xcor(), head.ycor())
+            segments.appendleft(last_segment)
 
     move()
+    recolor_segments()
+    wn.update()
     milliseconds_since_frame_start = (time.time() - frame_start_time) * 1000
     if milliseconds_since_frame_start > milliseconds_per_frame:
         wn.ontimer(updateGame)
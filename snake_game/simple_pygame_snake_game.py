@@ -1,25 +1,89 @@
-import pygame, random, os
+import time
+startTime = time.perf_counter()
+import pygame, random
+from collections import deque
+from snake_assets import getAssetPath, loadImage
 
-pygame.init()
+# How long each part of starting the game took, printed like SnakeGame.getStartupReport once the first frame is up.
+startupTimes = {}
+def recordStartupTime(name):
+    global startTime
+    currentTime = time.perf_counter()
+    startupTimes[name] = currentTime - startTime
+    startTime = currentTime
+recordStartupTime("imports")
+
+# Only start the parts of pygame the game uses, instead of everything with pygame.init().
+pygame.display.init()
+pygame.font.init()
 screen = pygame.display.set_mode((600, 600))
 clock = pygame.time.Clock()
+recordStartupTime("display")
 
 def getNewFoodPosition():
-    return (random.randint(0,screen.get_width()/20-1)*20,
-            random.randint(0,screen.get_height()/20-1)*20)
+    # Only pick from the cells that the snake isn't on, so the food never appears under the snake. The list of free
+    # cells is kept up to date as the tail moves, so picking one takes the same time however full the board is.
+    # The head isn't counted in tailGrid, so if it's on a free cell, that cell is moved to the end of the list and
+    # left out of the pick. Returns None if the snake fills the whole board.
+    freeCount = len(freeCells)
+    x, y = headPosition[0]//20, headPosition[1]//20
+    isHeadOnBoard = 0 <= x < len(tailGrid) and 0 <= y < len(tailGrid[0])
+    if isHeadOnBoard and tailGrid[x][y] == 0:
+        swapFreeCells(freeCellIndices[x][y], freeCount - 1)
+        freeCount -= 1
+    if freeCount == 0: return None
+    return freeCells[random.randrange(freeCount)]
+
+def getEmptyGrid():
+    return [[0]*(screen.get_height()//20) for _ in range(screen.get_width()//20)]
+
+def clearTail():
+    # Every cell starts free. freeCellIndices says where each free cell is in freeCells, so a cell can be taken out
+    # of the list without searching for it.
+    global tailGrid, freeCells, freeCellIndices
+    tailGrid = getEmptyGrid()
+    freeCells = [(x*20, y*20) for x in range(len(tailGrid)) for y in range(len(tailGrid[x]))]
+    freeCellIndices = getEmptyGrid()
+    for index, (x, y) in enumerate(freeCells): freeCellIndices[x//20][y//20] = index
+
+def swapFreeCells(index1, index2):
+    cell1, cell2 = freeCells[index1], freeCells[index2]
+    freeCells[index1], freeCells[index2] = cell2, cell1
+    freeCellIndices[cell2[0]//20][cell2[1]//20] = index1
+    freeCellIndices[cell1[0]//20][cell1[1]//20] = index2
+
+def addToTail(position):
+    x, y = position[0]//20, position[1]//20
+    tailGrid[x][y] += 1
+    if tailGrid[x][y] == 1:
+        # Fill the hole left in the list of free cells with the last free cell.
+        swapFreeCells(freeCellIndices[x][y], len(freeCells) - 1)
+        freeCells.pop()
+
+def removeFromTail(position):
+    x, y = position[0]//20, position[1]//20
+    tailGrid[x][y] -= 1
+    if tailGrid[x][y] == 0:
+        freeCellIndices[x][y] = len(freeCells)
+        freeCells.append(position)
 
 headPosition = (300,300)
 headDirection = "stopped"
-tailPositions = []
+# A deque lets us add to the front and remove from the back quickly, no matter how long the tail is.
+tailPositions = deque()
+# How many tail segments are in each grid cell, so we can check for collisions without looping over the tail,
+# and a list of the cells with none in them, so we can place food without looping over the board.
+clearTail()
 tailColors = []
 tailColorOptions = ['forestgreen','limegreen','darkgreen', 'green','springgreen',
                        'greenyellow','lawngreen', 'palegreen','seagreen']
 foodPosition = getNewFoodPosition()
-foodImage = pygame.image.load(os.path.join(os.path.dirname(os.path.abspath(__file__)), "apple.gif"))
-foodImage = pygame.transform.scale(foodImage, (20, 20))
+# The image and font are loaded when the first frame is drawn, but a missing image should stop the game right away.
+getAssetPath("apple.gif")
+foodImage = None
 score = 0
 highScore = 0
-scoreFont = pygame.font.Font(None, 24)
+scoreFont = None
 gameSpeed = 2
 
 running = True
@@ -40,9 +104,11 @@ while running:
                 newDirection = "left"
     if newDirection is not None: headDirection = newDirection
 
-    for i in range(len(tailPositions)-1,0,-1):
-        tailPositions[i] = tailPositions[i-1]
-    if len(tailPositions) > 0: tailPositions[0] = headPosition
+    if len(tailPositions) > 0:
+        oldTailPosition = tailPositions.pop()
+        removeFromTail(oldTailPosition)
+        tailPositions.appendleft(headPosition)
+        addToTail(headPosition)
 
     if headDirection == "up": headPosition = (headPosition[0], headPosition[1] - 20)
     elif headDirection == "down": headPosition = (headPosition[0], headPosition[1] + 20)
@@ -52,17 +118,18 @@ while running:
     isHeadOutOfBounds = (headPosition[0] >= screen.get_width() or headPosition[0] < 0 or
                          headPosition[1] >= screen.get_height() or headPosition[1] < 0)
     
-    isheadOnTail = False
-    for tailPosition in tailPositions:
-        if headPosition == tailPosition: isheadOnTail = True
+    isheadOnTail = not isHeadOutOfBounds and tailGrid[headPosition[0]//20][headPosition[1]//20] > 0
 
     if isHeadOutOfBounds or isheadOnTail:
         headPosition = (300,300)
         headDirection = "stopped"
-        tailPositions = []
+        tailPositions = deque()
         tailColors = []
+        clearTail()
         score = 0
         gameSpeed = 2
+        # The food was left where it was, unless the last game filled the board or the new snake is sitting on it.
+        if foodPosition is None or foodPosition == headPosition: foodPosition = getNewFoodPosition()
 
     elif headPosition == foodPosition:
         foodPosition = getNewFoodPosition()
@@ -70,18 +137,31 @@ while running:
         if score > highScore: highScore = score
         gameSpeed += 0.5
         tailPositions.append(headPosition)
+        addToTail(headPosition)
         tailColors.append(random.choice(tailColorOptions))
 
+    if foodImage is None:
+        recordStartupTime("game objects")
+        foodImage = loadImage("apple.gif", (20, 20))
+        recordStartupTime("assets")
+        scoreFont = pygame.font.Font(None, 24)
+        recordStartupTime("font")
+
     screen.fill("black")
-    for i in range(len(tailPositions)-1,-1,-1):
-        pygame.draw.rect(screen, tailColors[i], pygame.Rect(tailPositions[i], (20,20)))
+    for tailPosition, tailColor in zip(tailPositions, tailColors):
+        pygame.draw.rect(screen, tailColor, pygame.Rect(tailPosition, (20,20)))
     pygame.draw.rect(screen, "red", pygame.Rect(headPosition, (20,20)))
-    screen.blit(foodImage, foodPosition)
+    if foodPosition is not None: screen.blit(foodImage, foodPosition)
 
     text = scoreFont.render(f"Score: {score}   High Score: {highScore}", True, "white")
     screen.blit(text, text.get_rect(center = (300,10)))
 
     pygame.display.flip()
+    if startTime is not None:
+        recordStartupTime("first frame")
+        print(f"Started in {sum(startupTimes.values())*1000:.1f} ms: " +
+              ", ".join(f"{name} {seconds*1000:.1f} ms" for name, seconds in startupTimes.items()))
+        startTime = None
     clock.tick(gameSpeed)
     
 pygame.quit()
\ No newline at end of file
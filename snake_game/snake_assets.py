@@ -0,0 +1,98 @@
+import os, time
+from typing import Dict, Tuple
+
+# pygame is only imported inside the functions that need it, so the turtle versions can use getAssetPath
+# without loading pygame.
+
+ASSET_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+TILE_SIZE = 20
+# A color that doesn't appear in any sprite, used to mark the see-through parts of the atlas.
+TRANSPARENT_COLOR = (255, 0, 255)
+
+# Loaded images, keyed by (path, size), so each one is only loaded and scaled once per process.
+imageCache = {}
+# The total number of seconds spent loading assets so far, for startup reports.
+assetLoadSeconds = 0.0
+
+
+def getAssetPath(fileName):
+    """
+    Returns the full path to an asset in the snake_game folder, no matter what folder the game was started from.
+    Raises a FileNotFoundError right away if the asset is missing.
+    """
+    path = os.path.join(ASSET_DIRECTORY, fileName)
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"The snake game can't start because the asset \"{fileName}\" is missing. "
+                                f"It should be at {path}.")
+    return path
+
+def loadImage(fileName, size: Tuple[int,int]):
+    """
+    Loads an image, scales it to the given size, and converts it to the screen's pixel format (if there is a
+    screen yet). The result is cached, so asking for the same image again costs nothing.
+    """
+    global assetLoadSeconds
+    import pygame
+    path = getAssetPath(fileName)
+    if (path, size) not in imageCache:
+        startTime = time.perf_counter()
+        image = pygame.transform.scale(pygame.image.load(path), size)
+        if pygame.display.get_surface() is not None: image = image.convert()
+        imageCache[(path, size)] = image
+        assetLoadSeconds += time.perf_counter() - startTime
+    return imageCache[(path, size)]
+
+
+class SpriteAtlas:
+    """
+    Every sprite in the game packed side by side into one surface: the apple, followed by one colored tile for
+    each color name given. Drawing a sprite means blitting part of this one surface, so nothing has to be loaded
+    or filled while the game is running.
+    The areas of each sprite are known right away, but the surface itself isn't made until it is first drawn, so
+    creating an atlas is cheap. Missing files are still reported right away.
+    """
+
+    def __init__(self, colors):
+        import pygame
+        self.colors = list(colors)
+        self.areas: Dict[str, pygame.Rect] = {}
+        for index, name in enumerate(["apple", *self.colors]):
+            self.areas[name] = pygame.Rect(index*TILE_SIZE, 0, TILE_SIZE, TILE_SIZE)
+        getAssetPath("apple.gif")
+        self.loadedSurface = None
+
+    # An example of a property that does its work the first time it is used.
+    @property
+    def surface(self):
+        if self.loadedSurface is None: self.loadedSurface = self.makeSurface()
+        return self.loadedSurface
+
+    def makeSurface(self):
+        global assetLoadSeconds
+        import pygame
+        loadSecondsBefore = assetLoadSeconds
+        startTime = time.perf_counter()
+        surface = pygame.Surface((TILE_SIZE*len(self.areas), TILE_SIZE))
+        surface.fill(TRANSPARENT_COLOR)
+        # The apple's own see-through color is skipped when it is blitted, leaving TRANSPARENT_COLOR behind.
+        surface.blit(loadImage("apple.gif", (TILE_SIZE, TILE_SIZE)), self.areas["apple"])
+        for color in self.colors: surface.fill(color, self.areas[color])
+        if pygame.display.get_surface() is not None: surface = surface.convert()
+        surface.set_colorkey(TRANSPARENT_COLOR, pygame.RLEACCEL)
+        # This already includes the time spent in loadImage above.
+        assetLoadSeconds = loadSecondsBefore + time.perf_counter() - startTime
+        return surface
+
+    def getArea(self, name):
+        return self.areas[name]
+
+
+atlases = {}
+
+def getSpriteAtlas(colors):
+    """
+    Returns the atlas for the given colors, creating it the first time it is asked for.
+    """
+    key = tuple(colors)
+    if key not in atlases: atlases[key] = SpriteAtlas(colors)
+    return atlases[key]
@@ -0,0 +1,259 @@
+import argparse, itertools, time
+from collections import deque
+from typing import Deque, List, Optional
+from snake_engine import SnakeEngine, SparseSnakeEngine, UP, DOWN, RIGHT, LEFT, DIRECTION_DELTAS, OPPOSITE_DIRECTIONS
+
+
+def getCycleDirection(x, y, width, height):
+    """
+    The direction to move from cell (x, y) to follow a loop that visits every cell of the board once: right
+    along the top row, back and forth across the rest of the board, then up the first column.
+    The board needs an even number of rows.
+    """
+    if x == 0: return UP if y > 0 else RIGHT
+    if y % 2 == 0: return RIGHT if x < width-1 else DOWN
+    if x > 1: return LEFT
+    return DOWN if y < height-1 else LEFT
+
+def getCycleDirections(width, height) -> Optional[List[int]]:
+    """
+    Returns the direction of the loop from getCycleDirection for every cell, or None if the board has an odd number
+    of rows and columns, since no such loop exists then. Boards with an odd number of rows use the same loop turned
+    on its side.
+    """
+    if height % 2 == 0:
+        return [getCycleDirection(x, y, width, height) for y in range(height) for x in range(width)]
+    if width % 2 == 0:
+        # Swapping x and y turns the loop on its side, which also swaps up with left and down with right.
+        swappedDirections = {UP: LEFT, DOWN: RIGHT, RIGHT: DOWN, LEFT: UP}
+        return [swappedDirections[getCycleDirection(y, x, height, width)] for y in range(height) for x in range(width)]
+    return None
+
+
+class Autopilot:
+    """
+    Steers a SnakeEngine by itself. Each tick, it follows the shortest path to the food (found with a breadth-first
+    search, which is the same as A* on a grid where every move costs the same), but only if the snake could still
+    reach its own tail after eating. Otherwise, it follows a loop around the whole board, or any move that keeps
+    the tail in reach.
+    Planning stops early once it has used up budgetMicroseconds for the tick, and the time spent on every tick is
+    kept so it can be reported.
+    """
+
+    # How many cells the search looks at between checks of the clock. Looking at a cell takes well under a
+    # microsecond, so a search never runs more than a few microseconds past the end of the tick's budget.
+    cellsPerTimeCheck = 16
+    # Searching stops this many nanoseconds before the budget runs out, to leave time for the last clock check to
+    # come around and for picking a move without searching.
+    reservedNanoseconds = 50_000
+
+    def __init__(self, engine: SnakeEngine, budgetMicroseconds = 2000):
+        if isinstance(engine, SparseSnakeEngine):
+            raise ValueError("The autopilot keeps search buffers for every cell, so it can't be used on a board "
+                             "this big.")
+        self.engine = engine
+        self.budgetNanoseconds = budgetMicroseconds*1000
+        width = engine.width
+        height = engine.height
+        cellCount = width*height
+
+        # The cells next to each cell, worked out once so the search never has to check for walls.
+        self.neighbors = []
+        for cell in range(cellCount):
+            x, y = engine.getCellPosition(cell)
+            self.neighbors.append(tuple(y2*width + x2 for x2, y2 in ((x, y-1), (x, y+1), (x+1, y), (x-1, y))
+                                        if not engine.isOutOfBounds(x2, y2)))
+        self.cycleDirections = getCycleDirections(width, height)
+
+        # Search buffers, made once and reused on every tick. Instead of clearing visited before each search,
+        # each search has its own number, and a cell counts as visited only if it holds the current number.
+        self.visited = [0]*cellCount
+        self.searchNumber = 0
+        self.parents = [0]*cellCount
+        self.queue = [0]*cellCount
+        self.deadline = 0
+        self.outOfTime = False
+
+        # The path being followed to the food, and how many of its cells the snake has been sent toward.
+        self.path: List[int] = []
+        self.pathIndex = 0
+        self.pathFood = -1
+
+        # How long planning took on recent ticks, in nanoseconds, and how many ticks went over the budget.
+        self.planningTimes: Deque[int] = deque(maxlen = 10_000)
+        self.ticksOverBudget = 0
+
+    def getDirection(self, fromCell, toCell):
+        difference = toCell - fromCell
+        if difference == 1: return RIGHT
+        if difference == -1: return LEFT
+        if difference > 0: return DOWN
+        return UP
+
+    def search(self, start, goal, occupied):
+        """
+        Returns the shortest list of cells from start (not included) to goal (included) that doesn't cross any
+        occupied cell except the goal itself, or None if there isn't one or the tick's time ran out.
+        """
+        if time.perf_counter_ns() > self.deadline:
+            self.outOfTime = True
+            return None
+        self.searchNumber += 1
+        searchNumber = self.searchNumber
+        visited = self.visited
+        parents = self.parents
+        queue = self.queue
+        neighbors = self.neighbors
+        visited[start] = searchNumber
+        queue[0] = start
+        read = 0
+        write = 1
+
+        while read < write:
+            cell = queue[read]
+            read += 1
+            if read % Autopilot.cellsPerTimeCheck == 0 and time.perf_counter_ns() > self.deadline:
+                self.outOfTime = True
+                return None
+            for neighbor in neighbors[cell]:
+                if visited[neighbor] == searchNumber: continue
+                if neighbor == goal:
+                    parents[neighbor] = cell
+                    return self.getPath(start, goal)
+                if occupied[neighbor]: continue
+                visited[neighbor] = searchNumber
+                parents[neighbor] = cell
+                queue[write] = neighbor
+                write += 1
+        return None
+
+    def getPath(self, start, goal):
+        path = [goal]
+        while path[-1] != start: path.append(self.parents[path[-1]])
+        path.pop()
+        path.reverse()
+        return path
+
+    def canReachTailAfter(self, path):
+        """
+        Checks whether the snake could still get to its tail after following the path to the food. Says no if the
+        tick's time runs out first.
+        The board after following the path only differs from the engine's on the path and on the cells the tail
+        moves out of, so instead of copying the whole board, those cells are changed on the engine's own board for
+        the search and changed back straight after. A snapshot sharing the board sees it exactly as it was.
+        """
+        engine = self.engine
+        body = engine.body
+        # Every move takes a cell off the tail, except the first one if the snake is still growing. Eating only
+        # makes the snake longer on the move after.
+        plannedLength = len(body) + engine.growing
+        if plannedLength == 1: return True
+        if len(path) >= plannedLength:
+            filledCells = path[len(path) - plannedLength:]
+            freedCells = list(body)
+            plannedTail = filledCells[0]
+        else:
+            filledCells = path
+            freedCells = list(itertools.islice(reversed(body), len(path) - engine.growing))
+            plannedTail = body[plannedLength - len(path) - 1]
+
+        occupied = engine.occupied
+        for cell in freedCells: occupied[cell] = 0
+        for cell in filledCells: occupied[cell] = 1
+        try: return self.search(path[-1], plannedTail, occupied) is not None
+        finally:
+            for cell in filledCells: occupied[cell] = 0
+            for cell in freedCells: occupied[cell] = 1
+
+    def getFallbackDirection(self):
+        """
+        Picks a move when there is no safe path to the food: the direction of the loop around the board if that
+        keeps the tail in reach, then any other direction that does, then any move that doesn't crash right away.
+        """
+        engine = self.engine
+        tail = engine.body[-1]
+        directions = [UP, DOWN, RIGHT, LEFT]
+        if self.cycleDirections is not None:
+            directions.remove(self.cycleDirections[engine.head])
+            directions.insert(0, self.cycleDirections[engine.head])
+
+        firstOpenDirection = None
+        for direction in directions:
+            dx, dy = DIRECTION_DELTAS[direction]
+            x = engine.headX + dx
+            y = engine.headY + dy
+            if engine.isOutOfBounds(x, y) or direction == OPPOSITE_DIRECTIONS[engine.direction]: continue
+            nextCell = y*engine.width + x
+            # The tail moves out of the way on the next tick, unless the snake is growing.
+            if engine.occupied[nextCell] and (nextCell != tail or engine.growing or len(engine.body) == 1): continue
+            if firstOpenDirection is None: firstOpenDirection = direction
+            if self.outOfTime: break
+            if nextCell == tail or self.search(nextCell, tail, engine.occupied) is not None: return direction
+        return firstOpenDirection
+
+    def plan(self):
+        engine = self.engine
+        # Keep following the current path as long as the food hasn't moved and the snake is where it should be.
+        # No other cell on the path can fill up before the snake gets there, so it stays safe.
+        if self.pathIndex < len(self.path) and engine.food == self.pathFood:
+            if engine.head == self.path[self.pathIndex-1]:
+                self.pathIndex += 1
+                return self.getDirection(engine.head, self.path[self.pathIndex-1])
+
+        self.path = []
+        if engine.food != -1:
+            path = self.search(engine.head, engine.food, engine.occupied)
+            if path is not None and self.canReachTailAfter(path):
+                self.path = path
+                self.pathIndex = 1
+                self.pathFood = engine.food
+                return self.getDirection(engine.head, path[0])
+        return self.getFallbackDirection()
+
+    def getAction(self):
+        """
+        Returns the direction code the snake should move in on this tick.
+        """
+        startTime = time.perf_counter_ns()
+        self.deadline = startTime + max(0, self.budgetNanoseconds - Autopilot.reservedNanoseconds)
+        self.outOfTime = False
+        direction = self.plan()
+        planningTime = time.perf_counter_ns() - startTime
+        self.planningTimes.append(planningTime)
+        if planningTime > self.budgetNanoseconds: self.ticksOverBudget += 1
+        if direction == self.engine.direction: return None
+        return direction
+
+    def getReport(self):
+        if not self.planningTimes: return "The autopilot hasn't planned anything yet."
+        planningTimes = sorted(self.planningTimes)
+        return (f"Autopilot planning over the last {len(planningTimes)} ticks: "
+                f"average {sum(planningTimes)/len(planningTimes)/1000:.1f} us, "
+                f"p99 {planningTimes[min(len(planningTimes)-1, len(planningTimes)*99//100)]/1000:.1f} us, "
+                f"worst {planningTimes[-1]/1000:.1f} us, {self.ticksOverBudget} ticks over the "
+                f"{self.budgetNanoseconds/1000:.0f} us budget")
+
+
+# Lets the autopilot play with no display and reports how well it did and how long it took to plan.
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Let the autopilot play the snake game with no display.")
+    parser.add_argument("--width", type = int, default = 30, help = "The board width, in cells.")
+    parser.add_argument("--height", type = int, default = 30, help = "The board height, in cells.")
+    parser.add_argument("--seed", type = int, default = 0, help = "The seed for food positions.")
+    parser.add_argument("--ticks", type = int, default = 100_000, help = "How many ticks to play.")
+    parser.add_argument("--budget", type = int, default = 2000, help = "Planning time allowed per tick, in microseconds.")
+    arguments = parser.parse_args()
+
+    engine = SnakeEngine(arguments.width, arguments.height, arguments.seed)
+    autopilot = Autopilot(engine, arguments.budget)
+    games = 0
+    startTime = time.perf_counter()
+    for tick in range(arguments.ticks):
+        state, reward, gameOver = engine.step(autopilot.getAction())
+        if gameOver:
+            games += 1
+            print(f"Game over after scoring {engine.finalScore} ({engine.deathCause}).")
+    elapsedTime = time.perf_counter() - startTime
+    print(f"Played {arguments.ticks:,} ticks in {elapsedTime:.2f} s. Current score {engine.score}, "
+          f"high score {engine.highScore}, {games} games over.")
+    print(autopilot.getReport())
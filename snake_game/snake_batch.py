@@ -0,0 +1,192 @@
+import argparse, json, multiprocessing, os, random, time
+from collections import Counter
+from snake_engine import SnakeEngine, UP, DOWN, RIGHT, LEFT, STOPPED, DIRECTION_DELTAS, OPPOSITE_DIRECTIONS
+
+# How a game ends if it is still going after the maximum number of ticks, so a snake that loops forever can't
+# hold up a batch.
+TIMED_OUT = "timed out"
+
+
+def randomPolicy(engine: SnakeEngine, rng: random.Random):
+    """
+    Turns a random way about one tick in ten.
+    """
+    if engine.direction == STOPPED or rng.random() < 0.1: return rng.choice((UP, DOWN, RIGHT, LEFT))
+    return None
+
+def greedyPolicy(engine: SnakeEngine, rng: random.Random):
+    """
+    Moves toward the food, but never into a wall or the snake's body if there is any other choice.
+    """
+    foodX, foodY = engine.getCellPosition(engine.food)
+    bestDirection = None
+    bestDistance = None
+    # Shuffling the directions breaks ties randomly.
+    directions = [UP, DOWN, RIGHT, LEFT]
+    rng.shuffle(directions)
+    for direction in directions:
+        if direction == OPPOSITE_DIRECTIONS[engine.direction]: continue
+        dx, dy = DIRECTION_DELTAS[direction]
+        x = engine.headX + dx
+        y = engine.headY + dy
+        if engine.isOutOfBounds(x, y) or engine.isOccupied(x, y): continue
+        distance = abs(foodX - x) + abs(foodY - y)
+        if bestDistance is None or distance < bestDistance:
+            bestDirection = direction
+            bestDistance = distance
+    return bestDirection
+
+POLICIES = {"random": randomPolicy, "greedy": greedyPolicy}
+
+
+class BatchStats:
+    """
+    Totals for a group of finished games. Stats from different chunks of games can be combined with merge(), so
+    each worker only has to send back one of these instead of every game.
+    """
+
+    def __init__(self):
+        self.games = 0
+        self.ticks = 0
+        self.seconds = 0.0
+        # How many games ended with each score, length and number of ticks, and how many ended each way.
+        self.scores = Counter()
+        self.lengths = Counter()
+        self.ticksSurvived = Counter()
+        self.deathCauses = Counter()
+
+    def add(self, score, length, ticks, deathCause):
+        self.games += 1
+        self.ticks += ticks
+        self.scores[score] += 1
+        self.lengths[length] += 1
+        self.ticksSurvived[ticks] += 1
+        self.deathCauses[deathCause] += 1
+
+    def merge(self, other: "BatchStats"):
+        self.games += other.games
+        self.ticks += other.ticks
+        self.seconds += other.seconds
+        self.scores.update(other.scores)
+        self.lengths.update(other.lengths)
+        self.ticksSurvived.update(other.ticksSurvived)
+        self.deathCauses.update(other.deathCauses)
+
+    @staticmethod
+    def getSummary(counts: Counter):
+        """
+        Returns the mean, some percentiles, and the maximum of a Counter of values.
+        """
+        total = sum(counts.values())
+        if total == 0: return {}
+        summary = {"mean": sum(value*count for value, count in counts.items())/total}
+        values = sorted(counts)
+        percentiles = [50, 90, 99]
+        seen = 0
+        for value in values:
+            seen += counts[value]
+            while percentiles and seen > total*percentiles[0]/100:
+                summary[f"p{percentiles.pop(0)}"] = value
+        summary["max"] = values[-1]
+        return summary
+
+    def toDict(self):
+        return {"games": self.games, "ticks": self.ticks, "score": BatchStats.getSummary(self.scores),
+                "length": BatchStats.getSummary(self.lengths),
+                "ticksSurvived": BatchStats.getSummary(self.ticksSurvived),
+                "deathCauses": dict(self.deathCauses)}
+
+
+def playGame(engine: SnakeEngine, policy, seed, maxTicks):
+    """
+    Plays one game from the start with the given policy. Returns the score, length and ticks survived, and how the
+    game ended.
+    """
+    engine.reset(seed)
+    rng = random.Random(seed)
+    step = engine.step
+    for tick in range(1, maxTicks + 1):
+        state, reward, gameOver = step(policy(engine, rng))
+        if gameOver: return engine.finalScore, engine.finalLength, tick, engine.deathCause
+    return engine.score, len(engine.body), maxTicks, TIMED_OUT
+
+def runChunk(chunk):
+    """
+    Plays a chunk of games in a worker process. Game number i always uses seed + i, so the results are the same no
+    matter how many processes share the work.
+    """
+    policyName, width, height, seed, firstGame, gameCount, maxTicks = chunk
+    startTime = time.perf_counter()
+    policy = POLICIES[policyName]
+    engine = SnakeEngine(width, height, seed)
+    stats = BatchStats()
+    for game in range(firstGame, firstGame + gameCount):
+        stats.add(*playGame(engine, policy, seed + game, maxTicks))
+    stats.seconds = time.perf_counter() - startTime
+    return stats
+
+def getChunks(policyName, width, height, seed, games, chunkSize, maxTicks):
+    for firstGame in range(0, games, chunkSize):
+        yield policyName, width, height, seed, firstGame, min(chunkSize, games - firstGame), maxTicks
+
+def runBatch(policyName, games, width = 30, height = 30, seed = 0, processes = None, chunkSize = 100,
+             maxTicks = 100_000, onChunk = None):
+    """
+    Plays games spread across a pool of processes, and returns their combined BatchStats. Results come back one
+    chunk at a time as soon as each chunk finishes, and onChunk (if given) is called with the totals so far.
+    """
+    chunks = getChunks(policyName, width, height, seed, games, chunkSize, maxTicks)
+    stats = BatchStats()
+    # With one process, skipping the pool makes it easy to measure how well the pool scales.
+    pool = None if processes == 1 else multiprocessing.Pool(processes)
+    try:
+        results = map(runChunk, chunks) if pool is None else pool.imap_unordered(runChunk, chunks)
+        for chunkStats in results:
+            stats.merge(chunkStats)
+            if onChunk is not None: onChunk(stats)
+    finally:
+        if pool is not None: pool.terminate()
+    return stats
+
+
+# Plays lots of games with no display and prints how they went.
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Play many headless snake games at once and summarize them.")
+    parser.add_argument("--games", type = int, default = 10_000, help = "How many games to play.")
+    parser.add_argument("--policy", choices = POLICIES, default = "greedy", help = "How the snake is steered.")
+    parser.add_argument("--width", type = int, default = 30, help = "The board width, in cells.")
+    parser.add_argument("--height", type = int, default = 30, help = "The board height, in cells.")
+    parser.add_argument("--seed", type = int, default = 0, help = "The seed for the first game. Game i uses seed+i.")
+    parser.add_argument("--processes", type = int, default = os.cpu_count(),
+                        help = "How many worker processes to use. 1 plays every game in this process.")
+    parser.add_argument("--chunk-size", type = int, default = 100,
+                        help = "How many games each worker plays before sending its results back.")
+    parser.add_argument("--max-ticks", type = int, default = 100_000,
+                        help = "Games still going after this many ticks are stopped and counted as timed out.")
+    parser.add_argument("--output", help = "Save the summary to this JSON file.")
+    arguments = parser.parse_args()
+
+    def printProgress(stats: BatchStats):
+        print(f"\r{stats.games:,}/{arguments.games:,} games", end = "", flush = True)
+
+    startTime = time.perf_counter()
+    stats = runBatch(arguments.policy, arguments.games, arguments.width, arguments.height, arguments.seed,
+                     arguments.processes, arguments.chunk_size, arguments.max_ticks, printProgress)
+    elapsedTime = time.perf_counter() - startTime
+    print()
+
+    summary = stats.toDict()
+    summary.update({"policy": arguments.policy, "boardWidth": arguments.width, "boardHeight": arguments.height,
+                    "seed": arguments.seed, "processes": arguments.processes, "seconds": elapsedTime,
+                    "gamesPerSecond": stats.games/elapsedTime, "ticksPerSecond": stats.ticks/elapsedTime,
+                    # How much of the elapsed time the workers spent playing, summed over every worker.
+                    "workerSeconds": stats.seconds})
+    for name in ("score", "length", "ticksSurvived"):
+        print(f"{name:>14}: " + ", ".join(f"{key} {value:,.1f}" if key == "mean" else f"{key} {value:,}"
+                                         for key, value in summary[name].items()))
+    print(f"{'death causes':>14}: " + ", ".join(f"{cause} {count:,}" for cause, count in stats.deathCauses.items()))
+    print(f"Played {stats.games:,} games ({stats.ticks:,} ticks) in {elapsedTime:.2f} s with "
+          f"{arguments.processes} processes: {summary['gamesPerSecond']:,.0f} games/sec, "
+          f"{summary['ticksPerSecond']:,.0f} ticks/sec")
+    if arguments.output is not None:
+        with open(arguments.output, "w") as outputFile: json.dump(summary, outputFile, indent = 2)
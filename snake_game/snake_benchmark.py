@@ -0,0 +1,352 @@
+import argparse, contextlib, json, math, os, platform, random, runpy, sys, time, tracemalloc, types
+from collections import deque
+
+# The pygame versions draw to a window that doesn't exist, so they can run without a display.
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+from snake_engine import UP, DOWN, RIGHT, LEFT, TAIL_COLORS
+from snake_autopilot import getCycleDirection
+
+SCRIPT_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+IMPLEMENTATIONS = ["simple_pygame", "complex_pygame", "original_turtle", "revised_turtle"]
+# The turtle versions have their board size built in: (grid width, grid height, distance between cells,
+# x of the left column, y of the top row). Only an even number of rows is used so the snake can loop forever.
+TURTLE_GRIDS = {"original_turtle": (58, 58, 10, -290, 290), "revised_turtle": (28, 28, 20, -280, 280)}
+
+DIRECTION_NAMES = {UP: "up", DOWN: "down", RIGHT: "right", LEFT: "left"}
+DIRECTION_KEYS = {UP: pygame.K_w, DOWN: pygame.K_s, RIGHT: pygame.K_d, LEFT: pygame.K_a}
+TURTLE_KEYS = {UP: "w", DOWN: "s", RIGHT: "d", LEFT: "a"}
+
+
+class BenchmarkFinished(Exception):
+    """
+    Raised from inside a game's loop to stop it once enough ticks have run.
+    """
+
+
+def getCyclePath(width, height, length):
+    """
+    The first length cells of the loop from getCycleDirection, starting at the top left corner.
+    """
+    path = [(0, 0)]
+    while len(path) < length:
+        x, y = path[-1]
+        dx, dy = {UP: (0,-1), DOWN: (0,1), RIGHT: (1,0), LEFT: (-1,0)}[getCycleDirection(x, y, width, height)]
+        path.append((x + dx, y + dy))
+    return path
+
+
+class TickTimer:
+    """
+    Records the time between calls to tick(), which is called once per game tick.
+    """
+
+    def __init__(self, ticks):
+        self.ticks = ticks
+        self.durations = []
+        self.lastTime = None
+
+    def tick(self):
+        """
+        Returns True once the requested number of ticks has been timed.
+        """
+        currentTime = time.perf_counter_ns()
+        if self.lastTime is not None: self.durations.append(currentTime - self.lastTime)
+        self.lastTime = currentTime
+        return len(self.durations) >= self.ticks
+
+
+def benchmarkComplexPygame(width, height, snakeLength, ticks):
+    from complex_pygame_snake_game import SnakeGame
+    game = SnakeGame(seed = 0, width = width, height = height)
+    engine = game.engine
+    path = getCyclePath(width, height, snakeLength)
+    engine.placeSnake([y*width + x for x, y in reversed(path)], getCycleDirection(*path[-1], width, height))
+    game.syncSegments()
+    game.updateDisplay()
+
+    timer = TickTimer(ticks)
+    timer.tick()
+    while not timer.tick():
+        game.checkEvents()
+        game.queueTurn(getCycleDirection(engine.headX, engine.headY, width, height))
+        game.tick()
+        game.updateDisplay()
+    pygame.quit()
+    return timer.durations
+
+def benchmarkSimplePygame(width, height, snakeLength, ticks):
+    timer = TickTimer(ticks)
+    path = getCyclePath(width, height, snakeLength)
+    realSetMode = pygame.display.set_mode
+    realGetEvents = pygame.event.get
+    realClock = pygame.time.Clock
+
+    class NullClock:
+        def tick(self, framerate = 0): return 0
+
+    def getEvents(*args, **kwargs):
+        # The script calls this once per tick, so we can use it to time ticks and steer the snake.
+        namespace = sys._getframe(1).f_globals
+        if timer.lastTime is None: placeSimpleSnake(namespace, path)
+        realGetEvents()
+        if timer.tick(): return [pygame.event.Event(pygame.QUIT)]
+        x, y = namespace["headPosition"]
+        direction = getCycleDirection(x//20, y//20, width, height)
+        if DIRECTION_NAMES[direction] == namespace["headDirection"]: return []
+        return [pygame.event.Event(pygame.KEYDOWN, key = DIRECTION_KEYS[direction])]
+
+    pygame.display.set_mode = lambda *args, **kwargs: realSetMode((width*20, height*20))
+    pygame.event.get = getEvents
+    pygame.time.Clock = NullClock
+    try: runpy.run_path(os.path.join(SCRIPT_DIRECTORY, "simple_pygame_snake_game.py"), run_name = "__benchmark__")
+    finally:
+        pygame.display.set_mode = realSetMode
+        pygame.event.get = realGetEvents
+        pygame.time.Clock = realClock
+    return timer.durations
+
+def placeSimpleSnake(namespace, path):
+    cells = [(x*20, y*20) for x, y in reversed(path)]
+    namespace["headPosition"] = cells[0]
+    namespace["headDirection"] = DIRECTION_NAMES[getCycleDirection(*path[-1], len(namespace["tailGrid"]),
+                                                                   len(namespace["tailGrid"][0]))]
+    namespace["tailPositions"] = deque(cells[1:])
+    namespace["tailColors"] = [random.choice(TAIL_COLORS) for _ in cells[1:]]
+    namespace["clearTail"]()
+    for position in cells[1:]: namespace["addToTail"](position)
+    if namespace["foodPosition"] in cells: namespace["foodPosition"] = namespace["getNewFoodPosition"]()
+
+
+class NullTurtle:
+    """
+    Stands in for turtle.Turtle. Keeps track of where it is, but never draws anything.
+    """
+
+    def __init__(self):
+        self.x = 0.0
+        self.y = 0.0
+        self.visible = True
+
+    # Any method we don't define here (color, shape, write, ...) just does nothing.
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+    def showturtle(self): self.visible = True
+    def hideturtle(self): self.visible = False
+    def isvisible(self): return self.visible
+
+    def goto(self, x, y = None):
+        if y is None: x, y = x
+        self.x = float(x)
+        self.y = float(y)
+
+    def setx(self, x): self.x = float(x)
+    def sety(self, y): self.y = float(y)
+    def xcor(self): return self.x
+    def ycor(self): return self.y
+    def position(self): return (self.x, self.y)
+
+    def distance(self, other):
+        return math.hypot(self.x - other.x, self.y - other.y)
+
+
+class NullScreen:
+    """
+    Stands in for turtle.Screen. Timers run one after another with no waiting, and onFrame is called before
+    every frame of the game.
+    """
+
+    def __init__(self, onFrame):
+        self.onFrame = onFrame
+        self.keyHandlers = {}
+        self.timers = deque()
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+    def onkeypress(self, handler, key = None): self.keyHandlers[key] = handler
+    def ontimer(self, handler, t = 0): self.timers.append(handler)
+
+    # Both versions schedule each frame with ontimer() and then start the main loop.
+    def mainloop(self):
+        namespace = sys._getframe(1).f_globals
+        while self.timers:
+            self.onFrame(namespace, self)
+            self.timers.popleft()()
+
+def runTurtleGame(implementation, onFrame):
+    """
+    Runs one of the turtle versions with stand-in turtles, calling onFrame(namespace, screen) before every frame,
+    until onFrame raises BenchmarkFinished.
+    """
+    turtleModule = types.ModuleType("turtle")
+    turtleModule.Turtle = NullTurtle
+    screen = NullScreen(onFrame)
+    turtleModule.Screen = lambda: screen
+    realTurtleModule = sys.modules.get("turtle")
+    realSleep = time.sleep
+    sys.modules["turtle"] = turtleModule
+    time.sleep = lambda seconds: None
+    try:
+        # The turtle versions print every turn, which we don't want to time.
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            runpy.run_path(os.path.join(SCRIPT_DIRECTORY, implementation + "_snake_game.py"),
+                           run_name = "__benchmark__")
+    except BenchmarkFinished: pass
+    finally:
+        time.sleep = realSleep
+        if realTurtleModule is None: del sys.modules["turtle"]
+        else: sys.modules["turtle"] = realTurtleModule
+
+def benchmarkTurtle(implementation, snakeLength, ticks):
+    width, height, step, left, top = TURTLE_GRIDS[implementation]
+    timer = TickTimer(ticks)
+    path = getCyclePath(width, height, snakeLength)
+
+    def onFrame(namespace, screen):
+        head = namespace["head"]
+        if timer.lastTime is None: placeTurtleSnake(namespace, path, TURTLE_GRIDS[implementation])
+        if timer.tick(): raise BenchmarkFinished()
+        direction = getCycleDirection(round((head.xcor() - left)/step), round((top - head.ycor())/step),
+                                      width, height)
+        if DIRECTION_NAMES[direction] != head.direction: screen.keyHandlers[TURTLE_KEYS[direction]]()
+
+    runTurtleGame(implementation, onFrame)
+    return timer.durations
+
+def placeTurtleSnake(namespace, path, grid):
+    width, height, step, left, top = grid
+    positions = [(left + x*step, top - y*step) for x, y in reversed(path)]
+    head = namespace["head"]
+    head.goto(positions[0])
+    head.direction = DIRECTION_NAMES[getCycleDirection(*path[-1], width, height)]
+    for position in positions[1:]:
+        segment = namespace["get_segment"]()
+        segment.goto(position)
+        namespace["segments"].append(segment)
+        namespace["segment_colors"].append(random.choice(TAIL_COLORS))
+        namespace["add_occupied"](namespace["get_position_key"](segment))
+    food = namespace["food"]
+    if namespace["get_position_key"](food) in namespace["occupied_positions"]:
+        food.goto(namespace["get_new_food_position"]())
+
+
+def runBenchmark(implementation, width, height, snakeLength, ticks):
+    if implementation == "complex_pygame": return benchmarkComplexPygame(width, height, snakeLength, ticks)
+    elif implementation == "simple_pygame": return benchmarkSimplePygame(width, height, snakeLength, ticks)
+    else: return benchmarkTurtle(implementation, snakeLength, ticks)
+
+def getPercentile(sortedValues, percent):
+    return sortedValues[min(len(sortedValues)-1, int(len(sortedValues)*percent/100))]
+
+def measure(implementation, width, height, snakeLength, ticks):
+    """
+    Runs one benchmark twice: once for timing, and once with tracemalloc on to find the peak memory use, since
+    tracemalloc slows everything down.
+    """
+    durations = sorted(runBenchmark(implementation, width, height, snakeLength, ticks))
+    tickMicroseconds = {f"p{percent}": getPercentile(durations, percent)/1000 for percent in (50, 90, 99)}
+    tickMicroseconds["max"] = durations[-1]/1000
+
+    tracemalloc.start()
+    runBenchmark(implementation, width, height, snakeLength, ticks)
+    peakMemory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {"implementation": implementation, "boardWidth": width, "boardHeight": height,
+            "snakeLength": snakeLength, "ticks": len(durations),
+            "ticksPerSecond": len(durations)/(sum(durations)/1e9),
+            "tickMicroseconds": tickMicroseconds,
+            "peakMemoryBytes": peakMemory}
+
+class UnslottedSegment:
+    """
+    A segment laid out the way complex_pygame_snake_game used to store them, kept only to compare memory use: a
+    dictionary of attributes, a Vector2 position in pixels, a color name and a reference to the screen.
+    """
+
+    def __init__(self, x, y, color, screen):
+        self.position = pygame.Vector2(x, y)
+        self.color = color
+        self.screen = screen
+        self.area = None
+
+def measureSegmentMemory(count):
+    """
+    Returns how many bytes count tail segments take up, for the old segment layout and for the slotted one.
+    """
+    from complex_pygame_snake_game import TailSegment
+    screen = pygame.Surface((20, 20))
+    # The segments fill a board 200 cells wide, like a very long snake would.
+    makers = {"unslotted": lambda i: UnslottedSegment(i % 200*20, i//200*20, TAIL_COLORS[i % len(TAIL_COLORS)],
+                                                      screen),
+              "slotted": lambda i: TailSegment(i % 200, i//200, i % len(TAIL_COLORS))}
+    sizes = {}
+    for name, makeSegment in makers.items():
+        tracemalloc.start()
+        segments = deque(makeSegment(i) for i in range(count))
+        sizes[name] = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del segments
+    return sizes
+
+def getBenchmarkCases(implementations, boardSizes, snakeLengths):
+    for implementation in implementations:
+        if implementation in TURTLE_GRIDS: boards = [TURTLE_GRIDS[implementation][:2]]
+        else: boards = [(size, size) for size in boardSizes]
+        for width, height in boards:
+            for snakeLength in snakeLengths:
+                # Leave plenty of room for food so the board never fills up during the run.
+                if snakeLength <= width*height//2: yield implementation, width, height, snakeLength
+
+def printComparison(results, previousResultsFilePath):
+    with open(previousResultsFilePath) as previousResultsFile: previousResults = json.load(previousResultsFile)
+    getKey = lambda result: (result["implementation"], result["boardWidth"], result["boardHeight"],
+                             result["snakeLength"])
+    previousByKey = {getKey(result): result for result in previousResults["results"]}
+    for result in results:
+        previous = previousByKey.get(getKey(result))
+        if previous is None: continue
+        print(f"{result['implementation']:>16} {result['boardWidth']}x{result['boardHeight']} "
+              f"length {result['snakeLength']}: {result['ticksPerSecond']/previous['ticksPerSecond']:.2f}x "
+              f"ticks/sec, {result['peakMemoryBytes']/max(1, previous['peakMemoryBytes']):.2f}x peak memory")
+
+
+# Runs every implementation through the same scripted game and saves the results.
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Compare the speed and memory use of the snake games.")
+    parser.add_argument("--implementations", nargs = "+", choices = IMPLEMENTATIONS, default = IMPLEMENTATIONS)
+    parser.add_argument("--ticks", type = int, default = 2000, help = "How many ticks to time for each case.")
+    parser.add_argument("--lengths", type = int, nargs = "+", default = [1, 50, 200],
+                        help = "The snake lengths to start with.")
+    parser.add_argument("--boards", type = int, nargs = "+", default = [30, 60],
+                        help = "Board sizes, in cells, for the pygame versions. The turtle boards are fixed.")
+    parser.add_argument("--output", default = "benchmark_results.json", help = "Where to save the results.")
+    parser.add_argument("--compare", help = "An earlier results file to compare against.")
+    parser.add_argument("--segment-memory", type = int, metavar = "COUNT",
+                        help = "Only measure how much memory COUNT tail segments use, old layout against new.")
+    arguments = parser.parse_args()
+
+    if arguments.segment_memory is not None:
+        for name, size in measureSegmentMemory(arguments.segment_memory).items():
+            print(f"{name:>10}: {size/1024:>10.1f} KiB for {arguments.segment_memory:,} segments, "
+                  f"{size/arguments.segment_memory:.1f} bytes each")
+        sys.exit()
+
+    results = []
+    for case in getBenchmarkCases(arguments.implementations, arguments.boards, arguments.lengths):
+        result = measure(*case, arguments.ticks)
+        results.append(result)
+        print(f"{result['implementation']:>16} {result['boardWidth']}x{result['boardHeight']} "
+              f"length {result['snakeLength']:>5}: {result['ticksPerSecond']:>10,.0f} ticks/sec, "
+              f"p99 {result['tickMicroseconds']['p99']:>8.1f} us, "
+              f"peak {result['peakMemoryBytes']/1024:>8.1f} KiB")
+
+    with open(arguments.output, "w") as outputFile:
+        json.dump({"python": platform.python_version(), "pygame": pygame.version.ver,
+                   "platform": platform.platform(), "ticks": arguments.ticks, "results": results},
+                  outputFile, indent = 2)
+    if arguments.compare is not None: printComparison(results, arguments.compare)
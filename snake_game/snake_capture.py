@@ -0,0 +1,150 @@
+import argparse, os, queue, threading, time
+import pygame
+
+FORMATS = ["png", "raw"]
+# The names ffmpeg uses for each layout of pixels, by (bytes per pixel, red, green and blue masks). On a
+# little-endian computer, a red mask of 0xFF0000 means the bytes of each pixel are stored blue first.
+RAW_PIXEL_FORMATS = {(4, (0xFF0000, 0xFF00, 0xFF)): "bgr0", (4, (0xFF, 0xFF00, 0xFF0000)): "rgb0",
+                     (3, (0xFF0000, 0xFF00, 0xFF)): "bgr24", (3, (0xFF, 0xFF00, 0xFF0000)): "rgb24"}
+
+
+class FrameCapture:
+    """
+    Saves frames of the game on a background thread, so the game loop never waits for a file to be written.
+    Frames are copied into a fixed set of queueSize surfaces made when the first frame arrives, and handed to the
+    writer thread through a queue. If every surface is still waiting to be written, the frame is dropped and
+    counted, unless waitWhenFull is set, which is what capturing a replay uses since nobody is waiting on it.
+
+    The png format saves each frame to its own file in the outputPath folder. The raw format writes the pixels of
+    every frame, one after another, to the outputPath file straight from the surface's memory, which ffmpeg can
+    read with -f rawvideo using the pixel format and size from getReport().
+    """
+
+    def __init__(self, outputPath, format = "png", queueSize = 16, waitWhenFull = False):
+        if format not in FORMATS: raise ValueError(f"The capture format must be one of {FORMATS}, not {format!r}.")
+        self.outputPath = outputPath
+        self.format = format
+        self.queueSize = queueSize
+        self.waitWhenFull = waitWhenFull
+        self.outputFile = None
+        self.pixelFormat = None
+        self.frameSize = (0, 0)
+
+        # Surfaces ready to be copied into, and (frame number, surface) pairs waiting to be written.
+        self.freeSurfaces = None
+        self.waitingFrames = queue.Queue()
+        self.writer = None
+
+        self.framesCaptured = 0
+        self.framesDropped = 0
+        self.maxQueueDepth = 0
+        self.writeSeconds = 0
+
+    def start(self, screen: pygame.Surface):
+        """
+        Makes the surfaces and starts the writer thread. Called by the first capture().
+        """
+        self.frameSize = screen.get_size()
+        if self.format == "png":
+            os.makedirs(self.outputPath, exist_ok = True)
+        else:
+            self.pixelFormat = RAW_PIXEL_FORMATS.get((screen.get_bytesize(), screen.get_masks()[:3]))
+            if self.pixelFormat is None or screen.get_pitch() != screen.get_width()*screen.get_bytesize():
+                raise ValueError("The screen's pixels aren't laid out in a way that can be saved as raw video.")
+            self.outputFile = open(self.outputPath, "wb")
+        # Surfaces with the same pixel format as the screen, so copying a frame is a straight copy of memory.
+        self.freeSurfaces = queue.Queue()
+        for _ in range(self.queueSize): self.freeSurfaces.put(pygame.Surface(self.frameSize, 0, screen))
+        self.writer = threading.Thread(target = self.writeFrames, name = "frame writer", daemon = True)
+        self.writer.start()
+
+    def capture(self, screen: pygame.Surface):
+        """
+        Copies the screen and queues it to be written, or drops it if the queue is full.
+        """
+        if self.freeSurfaces is None: self.start(screen)
+        try: frame = self.freeSurfaces.get(block = self.waitWhenFull)
+        except queue.Empty:
+            self.framesDropped += 1
+            return
+        frame.blit(screen, (0, 0))
+        self.waitingFrames.put((self.framesCaptured, frame))
+        self.framesCaptured += 1
+        self.maxQueueDepth = max(self.maxQueueDepth, self.waitingFrames.qsize())
+
+    def writeFrames(self):
+        """
+        Runs on the writer thread, writing frames in order until close() sends None.
+        """
+        while True:
+            item = self.waitingFrames.get()
+            if item is None: return
+            frameNumber, frame = item
+            startTime = time.perf_counter()
+            if self.format == "png":
+                pygame.image.save(frame, os.path.join(self.outputPath, f"frame_{frameNumber:06d}.png"))
+            else:
+                # get_buffer() gives the surface's own memory, so nothing is copied on the way to the file.
+                self.outputFile.write(frame.get_buffer())
+            self.writeSeconds += time.perf_counter() - startTime
+            self.freeSurfaces.put(frame)
+
+    def close(self):
+        """
+        Waits for every queued frame to be written.
+        """
+        if self.writer is not None:
+            self.waitingFrames.put(None)
+            self.writer.join()
+            self.writer = None
+        if self.outputFile is not None:
+            self.outputFile.close()
+            self.outputFile = None
+
+    def getReport(self):
+        report = (f"Captured {self.framesCaptured:,} frames to {self.outputPath}, dropped {self.framesDropped:,}. "
+                  f"Deepest queue: {self.maxQueueDepth} of {self.queueSize} frames.")
+        if self.framesCaptured > 0:
+            report += f" Average write: {self.writeSeconds/self.framesCaptured*1000:.1f} ms."
+        if self.pixelFormat is not None:
+            report += f" Raw frames are {self.frameSize[0]}x{self.frameSize[1]} {self.pixelFormat}."
+        return report
+
+
+def captureReplay(replay, capture: FrameCapture):
+    """
+    Draws every tick of a replay and captures it, as fast as the frames can be written instead of at the speed the
+    game was played. Nothing is shown on screen.
+    """
+    from complex_pygame_snake_game import SnakeGame
+    game = SnakeGame(replay = replay, capture = capture)
+    game.running = True
+    game.updateDisplay()
+    while True:
+        game.tick()
+        if not game.running: break
+        game.updateDisplay()
+    capture.close()
+    pygame.quit()
+
+
+# Turns a replay file into a folder of PNG images or a raw video file without opening a window.
+if __name__ == "__main__":
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    from snake_replay import Replay
+
+    parser = argparse.ArgumentParser(description = "Save every frame of a recorded snake game.")
+    parser.add_argument("replayFile", help = "The replay to capture.")
+    parser.add_argument("output", help = "The folder for PNG frames, or the file for raw frames.")
+    parser.add_argument("--format", choices = FORMATS, default = "png", help = "How to save the frames.")
+    parser.add_argument("--queue-size", type = int, default = 16, help = "How many frames can wait to be written.")
+    arguments = parser.parse_args()
+
+    capture = FrameCapture(arguments.output, arguments.format, arguments.queue_size, waitWhenFull = True)
+    replay = Replay.load(arguments.replayFile)
+    startTime = time.perf_counter()
+    captureReplay(replay, capture)
+    elapsedTime = time.perf_counter() - startTime
+    print(capture.getReport())
+    print(f"Captured {replay.tickCount:,} ticks in {elapsedTime:.2f} s, "
+          f"{capture.framesCaptured/elapsedTime:,.0f} frames/sec.")
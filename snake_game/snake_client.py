@@ -0,0 +1,130 @@
+import argparse, socket
+import pygame
+from typing import Dict, List
+from snake_engine import UP, DOWN, RIGHT, LEFT, TAIL_COLORS
+from snake_multiplayer import FrameReader, decodeMessage, WELCOME
+from snake_assets import getSpriteAtlas
+from complex_pygame_snake_game import Score, SPRITE_COLORS
+
+
+class SnakeClient:
+    """
+    Shows a game hosted by snake_multiplayer.py and sends the arrow keys (or WASD) back to it. The client doesn't
+    know the rules at all: it just keeps track of which sprite belongs in each cell, changes the cells each tick
+    message mentions, and redraws only those cells.
+    """
+
+    keyDirections = {pygame.K_w: UP, pygame.K_s: DOWN, pygame.K_d: RIGHT, pygame.K_a: LEFT,
+                     pygame.K_UP: UP, pygame.K_DOWN: DOWN, pygame.K_RIGHT: RIGHT, pygame.K_LEFT: LEFT}
+
+    def __init__(self, host = "127.0.0.1", port = 8765):
+        self.connection = socket.create_connection((host, port))
+        self.connection.setblocking(False)
+        self.frameReader = FrameReader()
+        self.screen = None
+        self.atlas = None
+        self.score = None
+        self.playerId = None
+        self.width = 0
+        # The sprite drawn in each cell (None for empty cells), and the head cell of each player.
+        self.cellSprites: List[str] = []
+        self.heads: Dict[int, int] = {}
+        self.dirtyCells = set()
+
+    def getTailSprite(self, playerId):
+        return TAIL_COLORS[playerId % len(TAIL_COLORS)]
+
+    def setCell(self, cell, sprite):
+        if self.cellSprites[cell] != sprite:
+            self.cellSprites[cell] = sprite
+            self.dirtyCells.add(cell)
+
+    def moveHead(self, playerId, cell):
+        # The old head becomes part of the tail.
+        if playerId in self.heads: self.setCell(self.heads[playerId], self.getTailSprite(playerId))
+        self.heads[playerId] = cell
+        self.setCell(cell, "red")
+
+    def applyWelcome(self, message):
+        self.playerId = message["playerId"]
+        self.width = message["width"]
+        self.screen = pygame.display.set_mode((message["width"]*20, message["height"]*20))
+        pygame.display.set_caption(f"Snake - player {self.playerId}")
+        self.atlas = getSpriteAtlas(SPRITE_COLORS)
+        self.score = Score(self.screen)
+        self.cellSprites = [None]*(message["width"]*message["height"])
+        for cell in message["foods"]: self.cellSprites[cell] = "apple"
+        for playerId, (score, cells) in message["snakes"].items():
+            for cell in cells: self.cellSprites[cell] = self.getTailSprite(playerId)
+            if cells: self.moveHead(playerId, cells[0])
+            if playerId == self.playerId: self.score.score = score
+        self.dirtyCells = set(range(len(self.cellSprites)))
+
+    def applyTick(self, message):
+        for cell in message["freed"]: self.setCell(cell, None)
+        # Players whose head was just freed died or left, so their old head shouldn't turn into part of a tail.
+        for playerId, cell in list(self.heads.items()):
+            if self.cellSprites[cell] is None: del self.heads[playerId]
+        for playerId, cell in message["heads"]: self.moveHead(playerId, cell)
+        for cell in message["foods"]: self.setCell(cell, "apple")
+        for playerId, score in message["scores"]:
+            if playerId == self.playerId:
+                self.score.score = score
+                self.score.highScore = max(self.score.highScore, score)
+
+    def receive(self):
+        while True:
+            try: data = self.connection.recv(65536)
+            except BlockingIOError: return True
+            if not data: return False
+            for payload in self.frameReader.feed(data):
+                message = decodeMessage(payload)
+                if message["type"] == WELCOME: self.applyWelcome(message)
+                else: self.applyTick(message)
+
+    def getCellsUnder(self, rect: pygame.Rect):
+        rect = rect.clip(self.screen.get_rect())
+        return [y*self.width + x for y in range(rect.top//20, (rect.bottom - 1)//20 + 1)
+                for x in range(rect.left//20, (rect.right - 1)//20 + 1)]
+
+    def draw(self):
+        if self.screen is None or not self.dirtyCells: return
+        # The score is drawn on top of the board, so the cells under it are drawn again each time, which also
+        # erases the old text before the new text is drawn.
+        self.dirtyCells.update(self.getCellsUnder(self.score.rect))
+        rects = []
+        for cell in self.dirtyCells:
+            rect = pygame.Rect((cell % self.width)*20, (cell // self.width)*20, 20, 20)
+            self.screen.fill("black", rect)
+            if self.cellSprites[cell] is not None:
+                self.screen.blit(self.atlas.surface, rect, self.atlas.getArea(self.cellSprites[cell]))
+            rects.append(rect)
+        self.score.draw()
+        rects.append(self.score.rect)
+        pygame.display.update(rects)
+        self.dirtyCells.clear()
+
+    def play(self):
+        pygame.display.init()
+        clock = pygame.time.Clock()
+        running = True
+        while running:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT: running = False
+                if event.type == pygame.KEYDOWN and event.key in SnakeClient.keyDirections:
+                    self.connection.send(bytes((SnakeClient.keyDirections[event.key],)))
+            if not self.receive():
+                print("The server closed the connection.")
+                running = False
+            self.draw()
+            clock.tick(60)
+        self.connection.close()
+        pygame.quit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Join a multiplayer snake game.")
+    parser.add_argument("--host", default = "127.0.0.1", help = "The address of the server.")
+    parser.add_argument("--port", type = int, default = 8765, help = "The port the server is listening on.")
+    arguments = parser.parse_args()
+    SnakeClient(arguments.host, arguments.port).play()
@@ -0,0 +1,455 @@
+import itertools, random, time
+from collections import deque
+from typing import Deque, Optional
+
+# Direction codes used by the engine. Plain ints are much cheaper to compare and look up than enums or vectors.
+UP, DOWN, RIGHT, LEFT, STOPPED = range(5)
+
+# The (x, y) change in cell coordinates for each direction code.
+DIRECTION_DELTAS = ((0,-1), (0,1), (1,0), (-1,0), (0,0))
+
+# The direction that each direction code is not allowed to turn into.
+OPPOSITE_DIRECTIONS = (DOWN, UP, LEFT, RIGHT, None)
+
+# Ways a game can end, stored in SnakeEngine.deathCause. Out of bounds is the same check as isHeadOutOfBounds
+# in the simple version.
+OUT_OF_BOUNDS = "out of bounds"
+SELF_COLLISION = "self collision"
+
+TAIL_COLORS = ['forestgreen','limegreen','darkgreen', 'green','springgreen',
+               'greenyellow','lawngreen', 'palegreen','seagreen']
+
+# Boards with more cells than this use SparseSnakeEngine, which only remembers the cells the snake is on. Storing
+# every cell takes about 70 bytes per cell, so this keeps a full board under about 7 MB.
+SPARSE_CELL_LIMIT = 100_000
+
+# Every engine uses the same Zobrist keys, so equal positions get equal hashes on every engine with the same board.
+ZOBRIST_SEED = 0x5EED
+MASK_64_BITS = (1 << 64) - 1
+
+
+class HashedKeys:
+    """
+    Stands in for a list of random 64-bit keys that would be too big to store, by working out each key from its
+    index with the SplitMix64 mixing function. Looking up a key is slower than indexing a list, but takes no memory.
+    """
+
+    def __init__(self, salt):
+        self.salt = salt
+
+    def __getitem__(self, index):
+        number = (index*0x9E3779B97F4A7C15 + self.salt) & MASK_64_BITS
+        number = ((number ^ (number >> 30))*0xBF58476D1CE4E5B9) & MASK_64_BITS
+        number = ((number ^ (number >> 27))*0x94D049BB133111EB) & MASK_64_BITS
+        return number ^ (number >> 31)
+
+
+class ZobristKeys:
+    """
+    A random 64-bit key for each thing that can be true of a position: the head being in a cell, a segment in a
+    cell being followed by one in a given direction, the food being in a cell (or nowhere), the direction of
+    travel, and the snake still growing. The hash of a position is all of its keys XORed together, and since XOR
+    undoes itself, a move only has to XOR out the keys that stopped being true and XOR in the new ones.
+    Only the head and the links are stored: together they pin down every cell of the body, in order.
+    """
+
+    def __init__(self, cellCount, storeKeys = True):
+        generator = random.Random(ZOBRIST_SEED)
+        salts = itertools.count(1)
+        def makeKeys(count):
+            if storeKeys: return [generator.getrandbits(64) for _ in range(count)]
+            return HashedKeys(next(salts) << 32)
+        self.heads = makeKeys(cellCount)
+        # The key for a segment in cell c followed by the next one in direction d is links[c*4 + d].
+        self.links = makeKeys(cellCount*4)
+        # The key for the food in cell c is foods[c + 1], so that foods[0] is the key for no food at all.
+        self.foods = makeKeys(cellCount + 1)
+        self.directions = [generator.getrandbits(64) for _ in range(5)]
+        self.growing = generator.getrandbits(64)
+
+# The keys for each size of board, made the first time a board that size is hashed.
+zobristKeyTables = {}
+
+def getZobristKeys(cellCount):
+    if cellCount not in zobristKeyTables: zobristKeyTables[cellCount] = ZobristKeys(cellCount)
+    return zobristKeyTables[cellCount]
+
+
+class SnakeEngine:
+    """
+    The rules of the snake game with no display attached. Each cell of the board is numbered by its index,
+    y*width + x, and each call to step() advances the game by exactly one tick, so the game can run as fast
+    as the computer allows.
+    """
+
+    def __init__(self, width = 30, height = 30, seed = None):
+        self.width = width
+        self.height = height
+        # The Zobrist keys and the current hash, once getHash() has been called.
+        self.zobristKeys = None
+        self.hash = 0
+        self.reset(seed)
+
+    def reset(self, seed = None):
+        """
+        Starts a brand new game. Passing the same seed always produces the same food positions and tail colors.
+        If no seed is given, a random one is picked and stored in self.seed so the game can be replayed.
+        """
+        if seed is None: seed = random.getrandbits(63)
+        self.seed = seed
+        self.random = random.Random(seed)
+        # Set when a snapshot shares the snake and board, or the random number generator, with this engine, so they
+        # are copied before they change. See snapshot().
+        self.boardShared = False
+        self.randomShared = False
+        self.highScore = 0
+        self.clearBoard()
+        self.body: Deque[int] = deque()
+        # How the last game ended, and the score and length the snake had when it did.
+        self.deathCause = None
+        self.finalScore = 0
+        self.finalLength = 0
+        # No food yet, so restart() picks some once the snake is on the board.
+        self.food = -1
+        self.restart()
+        return self.getState()
+
+    def clearBoard(self):
+        # One byte per cell, set to 1 wherever the snake is. This lets us check for collisions without looking at
+        # every segment of the snake.
+        self.occupied = bytearray(self.width*self.height)
+        # Every cell the snake is not on, in no particular order, along with where each cell is in that list
+        # (or -1 for cells under the snake). Together they let us add, remove and pick a random free cell in
+        # the same amount of time no matter how full the board is.
+        self.freeCells = list(range(self.width*self.height))
+        self.freeCellIndices = list(range(self.width*self.height))
+
+    def restart(self):
+        """
+        Puts the snake back in the middle of the board after a game over, just like SnakeGame.checkForGameOver.
+        The high score and the food position are kept, unless the food is where the snake starts (or there is no
+        food), in which case new food is picked.
+        """
+        for cell in self.body: self.freeCell(cell)
+        self.headX = self.width//2
+        self.headY = self.height//2
+        self.head = self.headY*self.width + self.headX
+        self.direction = STOPPED
+        # The cells covered by the snake, starting with the head. Moving is one push onto the front and one pop
+        # off the back, no matter how long the snake is.
+        self.body = deque((self.head,))
+        self.fillCell(self.head)
+        if self.food == -1 or self.occupied[self.food]: self.food = self.getNewFoodPosition()
+        # The index into TAIL_COLORS for each segment behind the head, counting from the head. Like in the original
+        # game, the colors stay in their places as the snake moves, so the first segment is always the same color.
+        self.tailColors: Deque[int] = deque()
+        self.growing = False
+        # The cell the tail moved out of on the last tick, or -1 if no cell was freed.
+        self.freedCell = -1
+        self.score = 0
+        self.gameSpeed = 2
+        if self.zobristKeys is not None: self.hash = self.computeHash()
+
+    def endGame(self, cause):
+        """
+        Remembers how the game ended and how well the snake did, then restarts.
+        """
+        self.deathCause = cause
+        self.finalScore = self.score
+        # If the tail already moved this tick, it still counts toward the length the snake died with.
+        self.finalLength = len(self.body) + (self.freedCell != -1)
+        self.restart()
+
+    def copyBoard(self):
+        """
+        Gives the engine its own copy of everything a move changes, once a snapshot has been taken.
+        """
+        self.occupied = self.occupied[:]
+        self.freeCells = self.freeCells[:]
+        self.freeCellIndices = self.freeCellIndices[:]
+        self.body = deque(self.body)
+        self.tailColors = deque(self.tailColors)
+        self.boardShared = False
+
+    def getRandom(self):
+        """
+        Returns the random number generator, copying it first if a snapshot shares it. Copying it is slow compared
+        to a move, so it is only done when a random number is actually needed, which is only when food is eaten.
+        """
+        if self.randomShared:
+            generator = random.Random(0)
+            generator.setstate(self.random.getstate())
+            self.random = generator
+            self.randomShared = False
+        return self.random
+
+    def snapshot(self):
+        """
+        Returns the state of the game, which restore() can go back to any number of times, for players that try
+        out lots of moves before picking one. Taking a snapshot copies nothing: the snapshot shares the snake, the
+        board and the random number generator with the engine, and the engine copies them only when it is about
+        to change them. This is called copy-on-write.
+        The snapshot is a dictionary of the engine's attributes, which should be treated as read only.
+        """
+        self.boardShared = True
+        self.randomShared = True
+        return dict(self.__dict__)
+
+    def restore(self, snapshot):
+        """
+        Puts the game back the way it was when the snapshot was taken. The snapshot can be restored again later.
+        """
+        self.__dict__.update(snapshot)
+
+    def clone(self):
+        """
+        Returns a new engine in the same state as this one. Both share everything until one of them changes it.
+        """
+        engine = type(self).__new__(type(self))
+        engine.restore(self.snapshot())
+        return engine
+
+    def getZobristKeys(self):
+        return getZobristKeys(self.width*self.height)
+
+    def getDirectionBetween(self, fromCell, toCell):
+        """
+        Returns the direction code for moving from a cell to the cell next to it.
+        """
+        difference = toCell - fromCell
+        if difference == 1: return RIGHT
+        if difference == -1: return LEFT
+        if difference > 0: return DOWN
+        return UP
+
+    def computeHash(self):
+        """
+        Works out the hash of the position from scratch. See ZobristKeys for what goes into it.
+        """
+        keys = self.zobristKeys
+        body = self.body
+        hash = keys.heads[self.head] ^ keys.foods[self.food + 1] ^ keys.directions[self.direction]
+        if self.growing: hash ^= keys.growing
+        for cell, nextCell in zip(body, itertools.islice(body, 1, None)):
+            hash ^= keys.links[cell*4 + self.getDirectionBetween(cell, nextCell)]
+        return hash
+
+    def updateHash(self):
+        """
+        Brings the hash up to date after the snake moved into a new cell, using only what changed.
+        """
+        keys = self.zobristKeys
+        body = self.body
+        head = self.head
+        previousHead = body[1] if len(body) > 1 else self.freedCell
+        hash = self.hash ^ keys.heads[previousHead] ^ keys.heads[head]
+        if len(body) > 1: hash ^= keys.links[head*4 + self.getDirectionBetween(head, previousHead)]
+        # No cell is freed only when the snake was growing, and the last tail cell is no longer followed by anything.
+        if self.freedCell == -1: hash ^= keys.growing
+        elif len(body) > 1: hash ^= keys.links[body[-1]*4 + self.getDirectionBetween(body[-1], self.freedCell)]
+        # The snake only grows for one move after eating, so growing is only set now if it just ate.
+        if self.growing: hash ^= keys.growing ^ keys.foods[head + 1] ^ keys.foods[self.food + 1]
+        self.hash = hash
+
+    def getHash(self):
+        """
+        Returns a 64-bit Zobrist hash of the position: the cells of the snake in order, the food, the direction and
+        whether the snake is growing. Equal positions always have equal hashes, so a player searching ahead can use
+        it to skip positions it has already seen. The score and the random numbers aren't part of it.
+        The first call works the hash out from scratch, and from then on every move keeps it up to date.
+        """
+        if self.zobristKeys is None:
+            self.zobristKeys = self.getZobristKeys()
+            self.hash = self.computeHash()
+        return self.hash
+
+    def fillCell(self, cell):
+        """
+        Marks a cell as covered by the snake.
+        """
+        self.occupied[cell] = 1
+        # Fill the hole left in the list of free cells with the last free cell.
+        index = self.freeCellIndices[cell]
+        lastCell = self.freeCells.pop()
+        if lastCell != cell:
+            self.freeCells[index] = lastCell
+            self.freeCellIndices[lastCell] = index
+        self.freeCellIndices[cell] = -1
+
+    def freeCell(self, cell):
+        """
+        Marks a cell as no longer covered by the snake.
+        """
+        self.occupied[cell] = 0
+        self.freeCellIndices[cell] = len(self.freeCells)
+        self.freeCells.append(cell)
+
+    def placeSnake(self, cells, direction):
+        """
+        Replaces the snake with one covering the given cells (head first) and moving in the given direction.
+        This is handy for setting up tests and benchmarks with a long snake.
+        """
+        if self.boardShared: self.copyBoard()
+        for cell in self.body: self.freeCell(cell)
+        self.body = deque(cells)
+        for cell in self.body: self.fillCell(cell)
+        self.headX, self.headY = self.getCellPosition(self.body[0])
+        self.head = self.body[0]
+        self.direction = direction
+        self.tailColors = deque(self.getRandom().randrange(len(TAIL_COLORS)) for _ in range(len(self.body)-1))
+        self.growing = False
+        self.freedCell = -1
+        if self.food == -1 or self.occupied[self.food]: self.food = self.getNewFoodPosition()
+        if self.zobristKeys is not None: self.hash = self.computeHash()
+
+    def getNewFoodPosition(self):
+        """
+        Picks a random cell that the snake is not on, or returns -1 if the snake fills the whole board.
+        """
+        if not self.freeCells: return -1
+        return self.freeCells[self.getRandom().randrange(len(self.freeCells))]
+
+    def getCellPosition(self, cell):
+        """
+        Returns the (x, y) coordinates of the given cell index.
+        """
+        return (cell % self.width, cell // self.width)
+
+    def getState(self):
+        return (self.head, self.food, self.direction, self.score)
+
+    def turn(self, direction: Optional[int]):
+        if direction is not None and direction != OPPOSITE_DIRECTIONS[self.direction]:
+            if self.zobristKeys is not None:
+                self.hash ^= self.zobristKeys.directions[self.direction] ^ self.zobristKeys.directions[direction]
+            self.direction = direction
+
+    def isOutOfBounds(self, x, y):
+        return x >= self.width or x < 0 or y >= self.height or y < 0
+
+    def isOccupied(self, x, y):
+        return self.occupied[y*self.width + x] == 1
+
+    def step(self, action: Optional[int] = None):
+        """
+        Advances the game by one tick. The action is a direction code, or None to keep going the same way.
+        Returns the new state, the reward (1 for eating food, -1 for a game over, 0 otherwise), and whether the
+        game ended on this tick.
+        """
+        self.turn(action)
+        self.freedCell = -1
+        if self.direction == STOPPED: return self.getState(), 0, False
+        if self.boardShared: self.copyBoard()
+
+        dx, dy = DIRECTION_DELTAS[self.direction]
+        x = self.headX + dx
+        y = self.headY + dy
+        if x >= self.width or x < 0 or y >= self.height or y < 0:
+            self.endGame(OUT_OF_BOUNDS)
+            return self.getState(), -1, True
+        head = y*self.width + x
+
+        # The tail moves out of its last cell before the head moves in. Growing just skips this step.
+        if self.growing: self.growing = False
+        else:
+            self.freedCell = self.body.pop()
+            self.freeCell(self.freedCell)
+
+        if self.occupied[head]:
+            self.endGame(SELF_COLLISION)
+            return self.getState(), -1, True
+        self.body.appendleft(head)
+        self.fillCell(head)
+        self.head = head
+        self.headX = x
+        self.headY = y
+
+        reward = 0
+        if head == self.food:
+            self.food = self.getNewFoodPosition()
+            self.score += 1
+            if self.score > self.highScore: self.highScore = self.score
+            self.gameSpeed += 0.5
+            self.tailColors.append(self.getRandom().randrange(len(TAIL_COLORS)))
+            self.growing = True
+            reward = 1
+
+        if self.zobristKeys is not None: self.updateHash()
+        return self.getState(), reward, False
+
+
+class SparseOccupancy(set):
+    """
+    The set of cells the snake is on. It can be looked up by cell like the bytearray SnakeEngine uses, so the rules
+    don't need to know which one they have.
+    """
+
+    def __getitem__(self, cell):
+        return 1 if cell in self else 0
+
+
+class SparseSnakeEngine(SnakeEngine):
+    """
+    The same rules as SnakeEngine for boards far too big to keep a byte (and a list entry) for every cell, like
+    10,000 by 10,000. Only the cells the snake is on are stored, so memory depends on the snake's length instead of
+    the board's size. Food is placed by trying random cells until one is free, which almost always works on the
+    first try on a board this big.
+    """
+
+    def clearBoard(self):
+        self.occupied = SparseOccupancy()
+
+    def copyBoard(self):
+        self.occupied = SparseOccupancy(self.occupied)
+        self.body = deque(self.body)
+        self.tailColors = deque(self.tailColors)
+        self.boardShared = False
+
+    def getZobristKeys(self):
+        return ZobristKeys(self.width*self.height, storeKeys = False)
+
+    def fillCell(self, cell):
+        self.occupied.add(cell)
+
+    def freeCell(self, cell):
+        self.occupied.discard(cell)
+
+    def getNewFoodPosition(self):
+        cellCount = self.width*self.height
+        if len(self.occupied) == cellCount: return -1
+        generator = self.getRandom()
+        while True:
+            cell = generator.randrange(cellCount)
+            if cell not in self.occupied: return cell
+
+
+def makeEngine(width = 30, height = 30, seed = None):
+    """
+    Returns a SnakeEngine, or a SparseSnakeEngine if the board is too big to store every cell.
+    """
+    if width*height > SPARSE_CELL_LIMIT: return SparseSnakeEngine(width, height, seed)
+    return SnakeEngine(width, height, seed)
+
+
+# Runs the engine with random turns to show how many ticks per second it can manage.
+if __name__ == "__main__":
+    engine = SnakeEngine(seed = 0)
+    ticks = 1_000_000
+    actions = [random.choice((UP, DOWN, RIGHT, LEFT, None, None, None, None)) for _ in range(4096)]
+    startTime = time.perf_counter()
+    for tick in range(ticks): engine.step(actions[tick & 4095])
+    elapsedTime = time.perf_counter() - startTime
+    print(f"{ticks/elapsedTime:,.0f} ticks/sec")
+
+    # A snake 1,000 segments long, zigzagging across the top 25 rows of a 40x40 board with its head at the end.
+    engine = SnakeEngine(40, 40, seed = 0)
+    path = [y*40 + (x if y % 2 == 0 else 39 - x) for y in range(25) for x in range(40)]
+    engine.placeSnake(path[::-1], DOWN)
+    engine.getHash()
+    repeats = 100_000
+    for name, operation in (("snapshot", engine.snapshot), ("clone", engine.clone),
+                            ("clone and move once", lambda: engine.clone().step())):
+        startTime = time.perf_counter()
+        for _ in range(repeats): operation()
+        elapsedTime = time.perf_counter() - startTime
+        print(f"{name} with {len(engine.body):,} segments: {elapsedTime/repeats*1e6:.2f} us")
@@ -0,0 +1,86 @@
+import argparse, asyncio, random, time
+from collections import deque
+from typing import Deque
+from snake_engine import UP, LEFT
+from snake_multiplayer import FrameReader, decodeMessage, WELCOME
+
+
+class LoadStats:
+    """
+    What every fake player saw, added together.
+    """
+
+    def __init__(self):
+        self.connected = 0
+        self.disconnected = 0
+        self.messages = 0
+        self.bytesReceived = 0
+        self.turnsSent = 0
+        # The time between tick messages, in seconds, as seen by the fake players.
+        self.tickGaps: Deque[float] = deque(maxlen = 100_000)
+
+
+async def runFakePlayer(host, port, seconds, turnsPerSecond, stats: LoadStats):
+    """
+    Connects to the server and plays by turning randomly, while keeping track of how regularly ticks arrive.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    stats.connected += 1
+    frameReader = FrameReader()
+    endTime = time.perf_counter() + seconds
+    nextTurnTime = time.perf_counter() + random.expovariate(turnsPerSecond)
+    lastTickTime = None
+    try:
+        while time.perf_counter() < endTime:
+            try: data = await asyncio.wait_for(reader.read(65536), timeout = 0.1)
+            except asyncio.TimeoutError: data = b""
+            else:
+                if not data:
+                    stats.disconnected += 1
+                    return
+            stats.bytesReceived += len(data)
+            for payload in frameReader.feed(data):
+                message = decodeMessage(payload)
+                stats.messages += 1
+                if message["type"] == WELCOME: continue
+                currentTime = time.perf_counter()
+                if lastTickTime is not None: stats.tickGaps.append(currentTime - lastTickTime)
+                lastTickTime = currentTime
+            if time.perf_counter() >= nextTurnTime:
+                writer.write(bytes((random.randint(UP, LEFT),)))
+                stats.turnsSent += 1
+                nextTurnTime += random.expovariate(turnsPerSecond)
+    finally:
+        writer.close()
+
+async def runLoadTest(host, port, players, seconds, turnsPerSecond):
+    stats = LoadStats()
+    # Joining a little at a time is gentler on the server than everyone connecting at once.
+    tasks = []
+    for _ in range(players):
+        tasks.append(asyncio.create_task(runFakePlayer(host, port, seconds, turnsPerSecond, stats)))
+        await asyncio.sleep(0.002)
+    await asyncio.gather(*tasks)
+    return stats
+
+
+# Connects lots of fake players to a running snake_multiplayer.py server and reports how steady the ticks were.
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Put a multiplayer snake server under load.")
+    parser.add_argument("--host", default = "127.0.0.1", help = "The address of the server.")
+    parser.add_argument("--port", type = int, default = 8765, help = "The port the server is listening on.")
+    parser.add_argument("--players", type = int, default = 200, help = "How many fake players to connect.")
+    parser.add_argument("--seconds", type = float, default = 10, help = "How long each fake player stays connected.")
+    parser.add_argument("--turns-per-second", type = float, default = 2,
+                        help = "How often each fake player turns, on average.")
+    arguments = parser.parse_args()
+
+    stats = asyncio.run(runLoadTest(arguments.host, arguments.port, arguments.players, arguments.seconds,
+                                    arguments.turns_per_second))
+    print(f"{stats.connected} players connected, {stats.disconnected} were disconnected by the server.")
+    print(f"Received {stats.messages:,} messages ({stats.bytesReceived/1e6:.2f} MB) and sent {stats.turnsSent:,} turns.")
+    if stats.tickGaps:
+        tickGaps = sorted(stats.tickGaps)
+        print(f"Time between ticks: average {sum(tickGaps)/len(tickGaps)*1000:.1f} ms, "
+              f"p99 {tickGaps[min(len(tickGaps)-1, len(tickGaps)*99//100)]*1000:.1f} ms, "
+              f"worst {tickGaps[-1]*1000:.1f} ms")
@@ -0,0 +1,374 @@
+import argparse, asyncio, random, struct, time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+from snake_engine import UP, LEFT, STOPPED, DIRECTION_DELTAS, OPPOSITE_DIRECTIONS
+
+# Every message from the server is a 4 byte length followed by that many bytes, starting with one of these types.
+# Clients send nothing but single bytes, each one a direction code.
+FRAME_HEADER_FORMAT = "<I"
+WELCOME = 1
+TICK = 2
+# Message type, the player's id, board width and height, the current tick, and how many food cells and snakes
+# follow. Each snake is an id, a score and a length, followed by its cells from the head back.
+WELCOME_FORMAT = "<BHHHIHH"
+SNAKE_FORMAT = "<HIH"
+# Message type, the tick number, and how many freed cells, new heads, new food cells, score changes and players
+# who left follow, in that order. Freed cells come first because a head can move into a cell freed on the same tick.
+TICK_FORMAT = "<BIIHHHH"
+
+
+def packCells(cells):
+    return struct.pack(f"<{len(cells)}I", *cells)
+
+def packPairs(pairs):
+    """
+    Packs (player id, number) pairs, used for new heads and new scores.
+    """
+    data = bytearray()
+    for playerId, number in pairs: data += struct.pack("<HI", playerId, number)
+    return bytes(data)
+
+def packFrame(payload):
+    return struct.pack(FRAME_HEADER_FORMAT, len(payload)) + payload
+
+
+class FrameReader:
+    """
+    Collects bytes as they arrive and splits them back into the messages the server sent.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, data):
+        """
+        Adds newly received bytes, and returns every message that is now complete.
+        """
+        self.buffer += data
+        messages = []
+        headerSize = struct.calcsize(FRAME_HEADER_FORMAT)
+        offset = 0
+        while len(self.buffer) - offset >= headerSize:
+            length, = struct.unpack_from(FRAME_HEADER_FORMAT, self.buffer, offset)
+            if len(self.buffer) - offset - headerSize < length: break
+            messages.append(bytes(self.buffer[offset + headerSize:offset + headerSize + length]))
+            offset += headerSize + length
+        del self.buffer[:offset]
+        return messages
+
+
+def decodeMessage(payload):
+    """
+    Turns a message from the server into a dictionary. Welcome messages hold the whole board, and tick messages hold
+    only what changed.
+    """
+    if payload[0] == WELCOME:
+        _, playerId, width, height, tick, foodCount, snakeCount = struct.unpack_from(WELCOME_FORMAT, payload)
+        offset = struct.calcsize(WELCOME_FORMAT)
+        foods = list(struct.unpack_from(f"<{foodCount}I", payload, offset))
+        offset += 4*foodCount
+        snakes = {}
+        for _ in range(snakeCount):
+            snakeId, score, length = struct.unpack_from(SNAKE_FORMAT, payload, offset)
+            offset += struct.calcsize(SNAKE_FORMAT)
+            snakes[snakeId] = (score, list(struct.unpack_from(f"<{length}I", payload, offset)))
+            offset += 4*length
+        return {"type": WELCOME, "playerId": playerId, "width": width, "height": height, "tick": tick,
+                "foods": foods, "snakes": snakes}
+
+    _, tick, freedCount, headCount, foodCount, scoreCount, leftCount = struct.unpack_from(TICK_FORMAT, payload)
+    offset = struct.calcsize(TICK_FORMAT)
+    freed = struct.unpack_from(f"<{freedCount}I", payload, offset)
+    offset += 4*freedCount
+    heads = [struct.unpack_from("<HI", payload, offset + 6*index) for index in range(headCount)]
+    offset += 6*headCount
+    foods = struct.unpack_from(f"<{foodCount}I", payload, offset)
+    offset += 4*foodCount
+    scores = [struct.unpack_from("<HI", payload, offset + 6*index) for index in range(scoreCount)]
+    offset += 6*scoreCount
+    left = struct.unpack_from(f"<{leftCount}H", payload, offset)
+    return {"type": TICK, "tick": tick, "freed": freed, "heads": heads, "foods": foods, "scores": scores,
+            "left": left}
+
+
+class PlayerSnake:
+    """
+    One player's snake on the shared board.
+    """
+
+    def __init__(self, playerId):
+        self.playerId = playerId
+        # The cells covered by the snake, starting with the head. Empty while waiting for room to respawn.
+        self.body: Deque[int] = deque()
+        self.direction = STOPPED
+        # The last direction the player asked for since the previous tick.
+        self.nextDirection: Optional[int] = None
+        self.growing = False
+        self.score = 0
+
+
+class MultiplayerWorld:
+    """
+    The rules of the snake game for many snakes sharing one board. Every snake moves at the same time on each tick.
+    A snake dies if it leaves the board, runs into any snake, or moves into the same cell as another snake's head,
+    and comes back at a random free cell. Everything that changes is also written down, so that step() can hand
+    back just the changes since the last tick.
+    """
+
+    def __init__(self, width = 60, height = 60, seed = None, playersPerFood = 4):
+        self.width = width
+        self.height = height
+        self.random = random.Random(seed)
+        self.playersPerFood = playersPerFood
+        self.tick = 0
+        self.occupied = bytearray(width*height)
+        # Every cell no snake is on, with the same swap-and-pop bookkeeping as SnakeEngine.
+        self.freeCells = list(range(width*height))
+        self.freeCellIndices = list(range(width*height))
+        self.snakes: Dict[int, PlayerSnake] = {}
+        self.foods = set()
+        # What changed since the last tick.
+        self.freed: List[int] = []
+        self.heads: List[tuple] = []
+        self.newFoods: List[int] = []
+        self.scores: List[tuple] = []
+        self.left: List[int] = []
+
+    def fillCell(self, cell):
+        self.occupied[cell] = 1
+        index = self.freeCellIndices[cell]
+        lastCell = self.freeCells.pop()
+        if lastCell != cell:
+            self.freeCells[index] = lastCell
+            self.freeCellIndices[lastCell] = index
+        self.freeCellIndices[cell] = -1
+
+    def freeCell(self, cell):
+        self.occupied[cell] = 0
+        self.freeCellIndices[cell] = len(self.freeCells)
+        self.freeCells.append(cell)
+        self.freed.append(cell)
+
+    def getEmptyCell(self):
+        """
+        Returns a random cell with no snake or food on it, or -1 if there isn't one.
+        """
+        if len(self.freeCells) <= len(self.foods): return -1
+        while True:
+            cell = self.freeCells[self.random.randrange(len(self.freeCells))]
+            if cell not in self.foods: return cell
+
+    def spawn(self, snake: PlayerSnake):
+        cell = self.getEmptyCell()
+        if cell == -1: return
+        snake.body = deque((cell,))
+        snake.direction = STOPPED
+        snake.nextDirection = None
+        snake.growing = False
+        self.fillCell(cell)
+        self.heads.append((snake.playerId, cell))
+
+    def addFood(self):
+        cell = self.getEmptyCell()
+        if cell == -1: return
+        self.foods.add(cell)
+        self.newFoods.append(cell)
+
+    def addPlayer(self, playerId):
+        snake = PlayerSnake(playerId)
+        self.snakes[playerId] = snake
+        self.spawn(snake)
+        while len(self.foods) < 1 + len(self.snakes)//self.playersPerFood: self.addFood()
+        return snake
+
+    def removePlayer(self, playerId):
+        snake = self.snakes.pop(playerId)
+        for cell in snake.body: self.freeCell(cell)
+        self.left.append(playerId)
+
+    def turn(self, playerId, direction):
+        if UP <= direction <= LEFT and playerId in self.snakes: self.snakes[playerId].nextDirection = direction
+
+    def step(self):
+        """
+        Moves every snake by one tick.
+        """
+        self.tick += 1
+        moves = []
+        for snake in self.snakes.values():
+            if not snake.body:
+                self.spawn(snake)
+                continue
+            if snake.nextDirection is not None and snake.nextDirection != OPPOSITE_DIRECTIONS[snake.direction]:
+                snake.direction = snake.nextDirection
+            snake.nextDirection = None
+            if snake.direction == STOPPED: continue
+            dx, dy = DIRECTION_DELTAS[snake.direction]
+            x = snake.body[0] % self.width + dx
+            y = snake.body[0] // self.width + dy
+            newHead = -1 if x < 0 or x >= self.width or y < 0 or y >= self.height else y*self.width + x
+            moves.append((snake, newHead))
+
+        # Every tail moves out of the way first, so snakes can follow each other closely.
+        for snake, newHead in moves:
+            if snake.growing: snake.growing = False
+            else: self.freeCell(snake.body.pop())
+        # Two heads moving into the same cell both die.
+        headCounts: Dict[int, int] = {}
+        for snake, newHead in moves: headCounts[newHead] = headCounts.get(newHead, 0) + 1
+
+        dead = []
+        eaten = 0
+        for snake, newHead in moves:
+            if newHead == -1 or self.occupied[newHead] or headCounts[newHead] > 1:
+                dead.append(snake)
+                continue
+            snake.body.appendleft(newHead)
+            self.fillCell(newHead)
+            self.heads.append((snake.playerId, newHead))
+            if newHead in self.foods:
+                self.foods.remove(newHead)
+                snake.score += 1
+                snake.growing = True
+                self.scores.append((snake.playerId, snake.score))
+                eaten += 1
+
+        for snake in dead:
+            for cell in snake.body: self.freeCell(cell)
+            snake.body.clear()
+            if snake.score != 0:
+                snake.score = 0
+                self.scores.append((snake.playerId, 0))
+            self.spawn(snake)
+
+        # New food is only placed once every snake has moved, so it can't land where a head is about to go.
+        for _ in range(eaten): self.addFood()
+
+    def takeChanges(self):
+        """
+        Returns a tick message with everything that changed since the last one, and starts a new list of changes.
+        """
+        payload = (struct.pack(TICK_FORMAT, TICK, self.tick, len(self.freed), len(self.heads), len(self.newFoods),
+                               len(self.scores), len(self.left))
+                   + packCells(self.freed) + packPairs(self.heads) + packCells(self.newFoods)
+                   + packPairs(self.scores) + struct.pack(f"<{len(self.left)}H", *self.left))
+        self.freed = []
+        self.heads = []
+        self.newFoods = []
+        self.scores = []
+        self.left = []
+        return payload
+
+    def getWelcome(self, playerId):
+        """
+        Returns a message with the whole board, for a player who just joined.
+        """
+        data = bytearray(struct.pack(WELCOME_FORMAT, WELCOME, playerId, self.width, self.height, self.tick,
+                                     len(self.foods), len(self.snakes)))
+        data += packCells(list(self.foods))
+        for snake in self.snakes.values():
+            data += struct.pack(SNAKE_FORMAT, snake.playerId, snake.score, len(snake.body)) + packCells(snake.body)
+        return bytes(data)
+
+
+class SnakeServer:
+    """
+    Runs a MultiplayerWorld at tickRate ticks per second and shares it with every connected client. Each tick's
+    changes are packed into a message once and the same bytes are sent to everyone. Sending never waits for a
+    client, so a slow client can't hold up the tick. Instead, any client with more than maxBufferedBytes
+    waiting to be sent is disconnected.
+    """
+
+    maxBufferedBytes = 1_000_000
+    # If the server falls this many ticks behind, it gives up on catching up.
+    maxTicksBehind = 5
+
+    def __init__(self, host = "127.0.0.1", port = 8765, width = 60, height = 60, tickRate = 10, seed = None):
+        self.host = host
+        self.port = port
+        self.tickRate = tickRate
+        self.world = MultiplayerWorld(width, height, seed)
+        self.writers: Dict[int, asyncio.StreamWriter] = {}
+        self.nextPlayerId = 0
+        # How long recent ticks took, from moving the snakes to handing every client its message, in seconds.
+        self.tickTimes: Deque[float] = deque(maxlen = 1000)
+        self.bytesSent = 0
+
+    async def handleClient(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        playerId = self.nextPlayerId
+        self.nextPlayerId = (self.nextPlayerId + 1) % 65536
+        self.world.addPlayer(playerId)
+        writer.write(packFrame(self.world.getWelcome(playerId)))
+        self.writers[playerId] = writer
+        try:
+            while True:
+                data = await reader.read(64)
+                if not data: break
+                # Only the newest direction matters, since only one turn is used per tick.
+                self.world.turn(playerId, data[-1])
+        except ConnectionError: pass
+        finally: self.disconnect(playerId)
+
+    def disconnect(self, playerId):
+        writer = self.writers.pop(playerId, None)
+        if writer is None: return
+        self.world.removePlayer(playerId)
+        writer.close()
+
+    def broadcast(self, message):
+        for playerId, writer in list(self.writers.items()):
+            if writer.transport.get_write_buffer_size() > SnakeServer.maxBufferedBytes:
+                self.disconnect(playerId)
+                continue
+            writer.write(message)
+            self.bytesSent += len(message)
+
+    async def runTicks(self):
+        loop = asyncio.get_running_loop()
+        nextTickTime = loop.time()
+        while True:
+            startTime = time.perf_counter()
+            self.world.step()
+            self.broadcast(packFrame(self.world.takeChanges()))
+            self.tickTimes.append(time.perf_counter() - startTime)
+
+            nextTickTime += 1/self.tickRate
+            if loop.time() - nextTickTime > SnakeServer.maxTicksBehind/self.tickRate: nextTickTime = loop.time()
+            await asyncio.sleep(max(0, nextTickTime - loop.time()))
+
+    def getReport(self):
+        if not self.tickTimes: return "No ticks yet."
+        tickTimes = sorted(self.tickTimes)
+        return (f"tick {self.world.tick:,}: {len(self.writers)} players, tick time average "
+                f"{sum(tickTimes)/len(tickTimes)*1000:.2f} ms, p99 "
+                f"{tickTimes[min(len(tickTimes)-1, len(tickTimes)*99//100)]*1000:.2f} ms, worst "
+                f"{tickTimes[-1]*1000:.2f} ms, {self.bytesSent/1e6:.1f} MB sent")
+
+    async def reportEvery(self, seconds):
+        while True:
+            await asyncio.sleep(seconds)
+            print(self.getReport())
+
+    async def serve(self, reportSeconds = 5):
+        server = await asyncio.start_server(self.handleClient, self.host, self.port)
+        print(f"Serving a {self.world.width}x{self.world.height} board on {self.host}:{self.port} "
+              f"at {self.tickRate} ticks per second.")
+        async with server:
+            await asyncio.gather(self.runTicks(), self.reportEvery(reportSeconds), server.serve_forever())
+
+
+# Hosts a shared board for snake_client.py to connect to.
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Host a multiplayer snake game.")
+    parser.add_argument("--host", default = "127.0.0.1", help = "The address to listen on.")
+    parser.add_argument("--port", type = int, default = 8765, help = "The port to listen on.")
+    parser.add_argument("--width", type = int, default = 60, help = "The board width, in cells.")
+    parser.add_argument("--height", type = int, default = 60, help = "The board height, in cells.")
+    parser.add_argument("--tick-rate", type = float, default = 10, help = "How many ticks to run per second.")
+    parser.add_argument("--seed", type = int, help = "The seed for spawn and food positions.")
+    arguments = parser.parse_args()
+
+    server = SnakeServer(arguments.host, arguments.port, arguments.width, arguments.height, arguments.tick_rate,
+                         arguments.seed)
+    try: asyncio.run(server.serve())
+    except KeyboardInterrupt: print(server.getReport())
@@ -0,0 +1,117 @@
+import random, time
+import numpy as np
+import pygame
+from snake_engine import SnakeEngine, SparseSnakeEngine, UP, DOWN, RIGHT, LEFT
+
+# The channels of a grid observation. Each is 1 where the thing is and 0 everywhere else, and the body channel
+# doesn't include the head.
+HEAD_CHANNEL, BODY_CHANNEL, FOOD_CHANNEL = range(3)
+CHANNEL_COUNT = 3
+
+# The colors of a pixel observation. The food is yellow instead of an apple, so it can't be mistaken for the head
+# when each cell is only a few pixels. Empty cells are black.
+BODY_COLOR = "forestgreen"
+HEAD_COLOR = "red"
+FOOD_COLOR = "yellow"
+
+
+class Observer:
+    """
+    Turns the state of a SnakeEngine into NumPy arrays for training agents, with no window involved.
+    writeGrid() fills a height x width x CHANNEL_COUNT array of 0s and 1s. It reads the engine's occupied cells
+    through a NumPy view of the same memory, so the only work is one copy of the board into the body channel.
+    getPixels() draws the board at cellPixels pixels per cell on a shared pygame Surface and returns the Surface's
+    own pixels as a height x width x 3 array, so nothing is copied on the way out. The array stays up to date with
+    every call, but while it exists the Surface is locked, so the Surface can't be blitted anywhere.
+    The board is first drawn at one pixel per cell, straight into the memory of a small Surface, and then pygame
+    scales it up, which is much faster than NumPy writing each cell's square of pixels.
+    """
+
+    def __init__(self, engine: SnakeEngine, cellPixels = 2):
+        if isinstance(engine, SparseSnakeEngine):
+            raise ValueError("Observations have an entry for every cell, so they can't be made for a board this big.")
+        self.engine = engine
+        self.shape = (engine.height, engine.width, CHANNEL_COUNT)
+        # The engine's occupied bytearray, and a NumPy view of it. The engine replaces the bytearray when a new game
+        # starts or after a snapshot, so the view is made again whenever that happens.
+        self.occupiedSource = None
+        self.occupiedView = None
+
+        self.cellPixels = cellPixels
+        self.surface = None
+        self.pixels = None
+        # The Surface with one pixel per cell, the pixels of it as a height x width array of mapped colors, and the
+        # mapped colors themselves.
+        self.cellSurface = None
+        self.cellColors = None
+        self.mappedColors = None
+
+    def getOccupiedView(self):
+        engine = self.engine
+        if self.occupiedSource is not engine.occupied:
+            self.occupiedSource = engine.occupied
+            self.occupiedView = np.frombuffer(engine.occupied, dtype = np.uint8).reshape(engine.height, engine.width)
+        return self.occupiedView
+
+    def writeGrid(self, out: np.ndarray = None):
+        """
+        Writes the grid observation into out, which must be a uint8 array of shape (height, width, CHANNEL_COUNT),
+        and returns it. A new array is made if out isn't given.
+        """
+        if out is None: out = np.zeros(self.shape, dtype = np.uint8)
+        elif out.shape != self.shape or out.dtype != np.uint8:
+            raise ValueError(f"The observation buffer must be a uint8 array of shape {self.shape}.")
+        engine = self.engine
+        # Clearing the whole array is one fast pass over memory, which is quicker than clearing only the head and
+        # food channels, since they are spread out with the body channel in between.
+        out.fill(0)
+        out[:, :, BODY_CHANNEL] = self.getOccupiedView()
+        out[engine.headY, engine.headX, BODY_CHANNEL] = 0
+        out[engine.headY, engine.headX, HEAD_CHANNEL] = 1
+        if engine.food != -1:
+            foodX, foodY = engine.getCellPosition(engine.food)
+            out[foodY, foodX, FOOD_CHANNEL] = 1
+        return out
+
+    def getPixels(self):
+        """
+        Draws the board and returns the shared Surface's pixels as a (height*cellPixels, width*cellPixels, 3) array.
+        """
+        engine = self.engine
+        if self.surface is None:
+            self.surface = pygame.Surface((engine.width*self.cellPixels, engine.height*self.cellPixels))
+            self.cellSurface = self.surface if self.cellPixels == 1 else pygame.Surface((engine.width, engine.height))
+            # The surfarray functions index by x before y, so swapping the first two axes makes them match the grid.
+            self.pixels = pygame.surfarray.pixels3d(self.surface).transpose(1, 0, 2)
+            self.cellColors = pygame.surfarray.pixels2d(self.cellSurface).T
+            self.mappedColors = [np.uint32(self.cellSurface.map_rgb(pygame.Color(color)))
+                                 for color in (BODY_COLOR, HEAD_COLOR, FOOD_COLOR)]
+
+        bodyColor, headColor, foodColor = self.mappedColors
+        # Black maps to 0, so multiplying the occupied cells by the body color colors the whole board in one go.
+        np.multiply(self.getOccupiedView(), bodyColor, out = self.cellColors)
+        self.cellColors[engine.headY, engine.headX] = headColor
+        if engine.food != -1:
+            foodX, foodY = engine.getCellPosition(engine.food)
+            self.cellColors[foodY, foodX] = foodColor
+        if self.cellSurface is not self.surface:
+            pygame.transform.scale(self.cellSurface, self.surface.get_size(), self.surface)
+        return self.pixels
+
+
+# Plays random moves on a 30x30 board and reports how long each kind of observation takes.
+if __name__ == "__main__":
+    engine = SnakeEngine(30, 30, seed = 0)
+    observer = Observer(engine)
+    grid = np.zeros(observer.shape, dtype = np.uint8)
+    generator = random.Random(0)
+    actions = [generator.choice((UP, DOWN, RIGHT, LEFT, None, None, None, None)) for _ in range(4096)]
+    ticks = 100_000
+    for name, observe in (("grid", lambda: observer.writeGrid(grid)), ("pixels", observer.getPixels)):
+        observeTime = 0
+        for tick in range(ticks):
+            engine.step(actions[tick & 4095])
+            startTime = time.perf_counter_ns()
+            observe()
+            observeTime += time.perf_counter_ns() - startTime
+        print(f"{name}: {observeTime/ticks/1000:.2f} us per observation")
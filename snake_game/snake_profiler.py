@@ -0,0 +1,118 @@
+import csv, json, os, time
+from collections import deque
+from typing import Deque, Dict, List
+
+# The phases of a frame, in the order they happen.
+PHASES = ["events", "step", "segments", "draw", "display"]
+
+
+class PhaseTimes:
+    """
+    The timing history for one phase. Durations are sorted into buckets by powers of two (bucket n holds
+    durations from 2**(n-1) up to 2**n nanoseconds), both for every sample ever taken and for only the most
+    recent ones.
+    """
+
+    bucketCount = 40
+
+    def __init__(self, windowSize):
+        self.count = 0
+        self.totalNanoseconds = 0
+        self.histogram = [0]*PhaseTimes.bucketCount
+        self.recentHistogram = [0]*PhaseTimes.bucketCount
+        self.recent: Deque[int] = deque(maxlen = windowSize)
+
+    def add(self, nanoseconds):
+        self.count += 1
+        self.totalNanoseconds += nanoseconds
+        bucket = min(nanoseconds.bit_length(), PhaseTimes.bucketCount-1)
+        self.histogram[bucket] += 1
+        # Keep the recent histogram up to date by removing the sample that is about to fall out of the window.
+        if len(self.recent) == self.recent.maxlen:
+            self.recentHistogram[min(self.recent[0].bit_length(), PhaseTimes.bucketCount-1)] -= 1
+        self.recent.append(nanoseconds)
+        self.recentHistogram[bucket] += 1
+
+    def getRecentPercentile(self, percent):
+        if not self.recent: return 0
+        recent = sorted(self.recent)
+        return recent[min(len(recent)-1, int(len(recent)*percent/100))]
+
+    def getRecentAverage(self):
+        if not self.recent: return 0
+        return sum(self.recent)/len(self.recent)
+
+
+class FrameProfiler:
+    """
+    Times each phase of the game loop with perf_counter_ns. Code being timed calls record() at the end of each
+    phase with the time the phase started, and gets back the time to use as the start of the next phase.
+    """
+
+    # How often the overlay's text is rendered again, so that drawing it barely affects the timings it shows.
+    overlayRefreshSeconds = 0.25
+
+    def __init__(self, outputPath = "snake_profile", showOverlay = False, windowSize = 600):
+        self.outputPath = outputPath
+        self.showOverlay = showOverlay
+        self.phases: Dict[str, PhaseTimes] = {phase: PhaseTimes(windowSize) for phase in PHASES}
+        self.overlayFont = None
+        self.overlayLines = []
+        self.overlayRenderTime = 0
+
+    @staticmethod
+    def fromEnvironment():
+        """
+        Returns a profiler if the SNAKE_PROFILE environment variable is set (to the path to save results to,
+        without an extension), or None otherwise. Setting SNAKE_PROFILE_OVERLAY=1 also shows the overlay.
+        """
+        outputPath = os.environ.get("SNAKE_PROFILE")
+        if not outputPath: return None
+        return FrameProfiler(outputPath, os.environ.get("SNAKE_PROFILE_OVERLAY") == "1")
+
+    def record(self, phase, startTime):
+        currentTime = time.perf_counter_ns()
+        self.phases[phase].add(currentTime - startTime)
+        return currentTime
+
+    def getOverlayLines(self) -> List[str]:
+        return [f"{phase:>8}: {times.getRecentAverage()/1e6:6.3f} ms avg, "
+                f"{times.getRecentPercentile(99)/1e6:6.3f} ms p99" for phase, times in self.phases.items()]
+
+    def drawOverlay(self, screen):
+        # Only load pygame's font module if the overlay is actually used.
+        import pygame
+        if self.overlayFont is None:
+            pygame.font.init()
+            self.overlayFont = pygame.font.Font(None, 16)
+        if time.perf_counter() - self.overlayRenderTime > FrameProfiler.overlayRefreshSeconds:
+            self.overlayLines = [self.overlayFont.render(line, True, "white", "black")
+                                 for line in self.getOverlayLines()]
+            self.overlayRenderTime = time.perf_counter()
+        for lineNumber, text in enumerate(self.overlayLines):
+            screen.blit(text, (4, 24 + lineNumber*14))
+
+    def getSummary(self):
+        return {phase: {"count": times.count, "totalNanoseconds": times.totalNanoseconds,
+                        "recentAverageNanoseconds": times.getRecentAverage(),
+                        "recentPercentileNanoseconds": {f"p{percent}": times.getRecentPercentile(percent)
+                                                        for percent in (50, 90, 99)},
+                        "histogram": times.histogram, "recentHistogram": times.recentHistogram}
+                for phase, times in self.phases.items()}
+
+    def save(self):
+        """
+        Writes the histograms to <outputPath>.json and <outputPath>.csv.
+        """
+        with open(self.outputPath + ".json", "w") as jsonFile:
+            json.dump({"bucketUpperBoundsNanoseconds": [2**bucket for bucket in range(PhaseTimes.bucketCount)],
+                       "phases": self.getSummary()}, jsonFile, indent = 2)
+
+        with open(self.outputPath + ".csv", "w", newline = "") as csvFile:
+            writer = csv.writer(csvFile)
+            writer.writerow(["phase", "bucketLowNanoseconds", "bucketHighNanoseconds", "count", "recentCount"])
+            for phase, times in self.phases.items():
+                for bucket in range(PhaseTimes.bucketCount):
+                    if times.histogram[bucket] == 0: continue
+                    writer.writerow([phase, 2**(bucket-1) if bucket > 0 else 0, 2**bucket,
+                                     times.histogram[bucket], times.recentHistogram[bucket]])
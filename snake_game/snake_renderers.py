@@ -0,0 +1,226 @@
+import abc, argparse, itertools, random, time
+from collections import deque
+from typing import Deque
+from snake_engine import SnakeEngine, TAIL_COLORS, makeEngine
+
+
+class Renderer(abc.ABC):
+    """
+    Draws the state of a SnakeEngine. Each backend fills in draw(), and render() is called after the game moves
+    forward but only draws once every renderEvery ticks, so the same game loop can be fully drawn, drawn now and then
+    to check on it, or not drawn at all with NullRenderer. The time each drawn frame took is kept for getReport().
+    """
+
+    name = "renderer"
+
+    def __init__(self, width, height, renderEvery = 1):
+        self.width = width
+        self.height = height
+        self.renderEvery = renderEvery
+        self.ticks = 0
+        self.framesDrawn = 0
+        self.frameTimes: Deque[int] = deque(maxlen = 10_000)
+        # Set to False once the player closes the window.
+        self.open = True
+
+    def render(self, engine: SnakeEngine, ticks = 1):
+        """
+        Called after the engine moves forward ticks ticks. Draws if that passed another multiple of renderEvery.
+        """
+        previousTicks = self.ticks
+        self.ticks += ticks
+        if self.ticks//self.renderEvery == previousTicks//self.renderEvery: return
+        startTime = time.perf_counter_ns()
+        self.draw(engine)
+        self.frameTimes.append(time.perf_counter_ns() - startTime)
+        self.framesDrawn += 1
+
+    @abc.abstractmethod
+    def draw(self, engine: SnakeEngine):
+        pass
+
+    def close(self):
+        pass
+
+    def getReport(self):
+        if not self.frameTimes: return f"The {self.name} renderer hasn't drawn anything yet."
+        frameTimes = sorted(self.frameTimes)
+        return (f"The {self.name} renderer drew {self.framesDrawn:,} frames in {self.ticks:,} ticks: "
+                f"average {sum(frameTimes)/len(frameTimes)/1e6:.3f} ms per frame, "
+                f"p99 {frameTimes[min(len(frameTimes)-1, len(frameTimes)*99//100)]/1e6:.3f} ms, "
+                f"worst {frameTimes[-1]/1e6:.3f} ms")
+
+
+class NullRenderer(Renderer):
+    """
+    Draws nothing, for soak tests and training where only the rules matter.
+    """
+
+    name = "null"
+
+    def draw(self, engine: SnakeEngine):
+        pass
+
+
+class PygameRenderer(Renderer):
+    """
+    Draws the board in a pygame window using SnakeGame's own drawing, including dirty rendering and the camera.
+    SnakeGame makes one of these for itself. Given no game, such as in runGame, it makes a SnakeGame to draw with,
+    and since the engine moves without that game's sprites following along, they are rebuilt from the engine's
+    cells before every frame, so it doesn't matter how many ticks went by since the last one.
+    """
+
+    name = "pygame"
+
+    def __init__(self, width, height, renderEvery = 1, game = None):
+        super().__init__(width, height, renderEvery)
+        self.ownsGame = game is None
+        if game is None:
+            # Only import pygame when this renderer is actually used. A game that passes itself in may have been
+            # started as a script, and importing its file again would load a second copy of it.
+            from complex_pygame_snake_game import SnakeGame
+            game = SnakeGame(width = width, height = height)
+        self.game = game
+
+    def draw(self, engine: SnakeEngine):
+        game = self.game
+        if self.ownsGame:
+            import pygame
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT: self.open = False
+            game.engine = engine
+            game.syncSegments()
+        game.updateDisplay()
+
+    def close(self):
+        # A game that made its own renderer closes the window itself when it ends.
+        if self.ownsGame:
+            import pygame
+            pygame.quit()
+
+
+class TurtleRenderer(Renderer):
+    """
+    Draws the board with turtle graphics, like the turtle versions of the game. Each tail segment is a turtle, and
+    turtles are kept in a pool and hidden when the snake gets shorter, instead of being made again every game.
+    """
+
+    name = "turtle"
+
+    def __init__(self, width, height, renderEvery = 1):
+        super().__init__(width, height, renderEvery)
+        import turtle
+        from snake_assets import getAssetPath
+        self.window = turtle.Screen()
+        self.window.title("Snake Game")
+        self.window.bgcolor("black")
+        self.window.setup(width = width*20, height = height*20)
+        # Turn off automatic drawing. Everything is drawn at once with update() at the end of each frame.
+        self.window.tracer(0)
+
+        self.head = self.makeTurtle("square", "red")
+        appleFilePath = getAssetPath("apple.gif")
+        self.window.register_shape(appleFilePath)
+        self.food = self.makeTurtle(appleFilePath)
+        self.pen = self.makeTurtle()
+        self.pen.color("white")
+        self.pen.hideturtle()
+        self.pen.goto(0, height*10 - 40)
+        self.penScores = None
+        # Every tail segment turtle ever made, and how many of them are showing.
+        self.segments = []
+        self.segmentsShown = 0
+
+    def makeTurtle(self, shape = "classic", color = "white"):
+        import turtle
+        newTurtle = turtle.Turtle()
+        newTurtle.speed(0)
+        newTurtle.shape(shape)
+        newTurtle.color(color)
+        newTurtle.penup()
+        return newTurtle
+
+    def getPosition(self, engine: SnakeEngine, cell):
+        """
+        Turtle puts (0, 0) in the middle of the window with y going up, so cells are measured from there.
+        """
+        x, y = engine.getCellPosition(cell)
+        return ((x - engine.width/2)*20 + 10, (engine.height/2 - y)*20 - 10)
+
+    def draw(self, engine: SnakeEngine):
+        import turtle
+        try:
+            tail = list(zip(itertools.islice(engine.body, 1, None), engine.tailColors))
+            while len(self.segments) < len(tail): self.segments.append(self.makeTurtle("square"))
+            for segment, (cell, colorIndex) in zip(self.segments, tail):
+                segment.color(TAIL_COLORS[colorIndex])
+                segment.goto(self.getPosition(engine, cell))
+            for segment in self.segments[len(tail):self.segmentsShown]: segment.hideturtle()
+            for segment in self.segments[self.segmentsShown:len(tail)]: segment.showturtle()
+            self.segmentsShown = len(tail)
+
+            self.head.goto(self.getPosition(engine, engine.head))
+            if engine.food == -1: self.food.hideturtle()
+            else:
+                self.food.showturtle()
+                self.food.goto(self.getPosition(engine, engine.food))
+            if self.penScores != (engine.score, engine.highScore):
+                self.penScores = (engine.score, engine.highScore)
+                self.pen.clear()
+                self.pen.write(f"Score: {engine.score}   High Score: {engine.highScore}", align = "center",
+                               font = ("Arial", 16, "normal"))
+            self.window.update()
+        # Turtle raises Terminator once its window has been closed.
+        except turtle.Terminator:
+            self.open = False
+
+    def close(self):
+        import turtle
+        try: self.window.bye()
+        except turtle.Terminator: pass
+
+
+RENDERERS = {"null": NullRenderer, "pygame": PygameRenderer, "turtle": TurtleRenderer}
+
+
+def runGame(engine: SnakeEngine, policy, renderer: Renderer, ticks, rng: random.Random, ticksPerSecond = None):
+    """
+    Plays ticks ticks with the policy choosing every move and the renderer drawing them, as fast as possible or
+    at ticksPerSecond. Stops early if the renderer's window is closed. Returns how many ticks were played.
+    """
+    startTime = time.perf_counter()
+    for tick in range(ticks):
+        engine.step(policy(engine, rng))
+        renderer.render(engine)
+        if not renderer.open: return tick + 1
+        if ticksPerSecond is not None:
+            waitTime = startTime + (tick + 1)/ticksPerSecond - time.perf_counter()
+            if waitTime > 0: time.sleep(waitTime)
+    return ticks
+
+
+# Plays one long game with a policy and any renderer, and reports how long the renderer took per frame.
+if __name__ == "__main__":
+    from snake_batch import POLICIES
+
+    parser = argparse.ArgumentParser(description = "Play the snake game with a policy and a choice of renderer.")
+    parser.add_argument("--renderer", choices = RENDERERS, default = "pygame", help = "How to draw the game.")
+    parser.add_argument("--render-every", type = int, default = 1, metavar = "N", help = "Only draw every Nth tick.")
+    parser.add_argument("--policy", choices = POLICIES, default = "greedy", help = "How the snake picks its moves.")
+    parser.add_argument("--ticks", type = int, default = 10_000, help = "How many ticks to play.")
+    parser.add_argument("--ticks-per-second", type = float, help = "Play at this speed instead of as fast as possible.")
+    parser.add_argument("--width", type = int, default = 30, help = "The board width, in cells.")
+    parser.add_argument("--height", type = int, default = 30, help = "The board height, in cells.")
+    parser.add_argument("--seed", type = int, default = 0, help = "The seed for the game and the policy.")
+    arguments = parser.parse_args()
+
+    engine = makeEngine(arguments.width, arguments.height, arguments.seed)
+    renderer = RENDERERS[arguments.renderer](arguments.width, arguments.height, arguments.render_every)
+    startTime = time.perf_counter()
+    ticks = runGame(engine, POLICIES[arguments.policy], renderer, arguments.ticks, random.Random(arguments.seed),
+                    arguments.ticks_per_second)
+    elapsedTime = time.perf_counter() - startTime
+    renderer.close()
+    print(f"Played {ticks:,} ticks in {elapsedTime:.2f} s ({ticks/elapsedTime:,.0f} ticks/sec), "
+          f"high score {engine.highScore}.")
+    print(renderer.getReport())
@@ -0,0 +1,168 @@
+import argparse, struct, time
+from typing import List, Optional, Tuple
+from snake_engine import SnakeEngine, STOPPED, makeEngine
+
+# Every replay file starts with these bytes so we can tell it apart from other files.
+MAGIC = b"SNKR"
+VERSION = 1
+# Magic, version, board width and height, seed, and number of ticks.
+HEADER_FORMAT = "<4sBHHQI"
+# The score, high score, head cell and snake length at the end of the recording, used to check the replay.
+RESULT_FORMAT = "<IIII"
+# The action code stored for ticks where no turn was requested.
+NO_TURN = STOPPED + 1
+
+
+def writeVarint(data: bytearray, number):
+    """
+    Writes a non-negative number using as few bytes as possible: 7 bits per byte, with the top bit set on every
+    byte except the last.
+    """
+    while number >= 0x80:
+        data.append((number & 0x7F) | 0x80)
+        number >>= 7
+    data.append(number)
+
+def readVarint(data: bytes, offset):
+    """
+    Reads a number written by writeVarint. Returns the number and the offset just past it.
+    """
+    number = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        number |= (byte & 0x7F) << shift
+        if byte < 0x80: return number, offset
+        shift += 7
+
+
+class Replay:
+    """
+    A recorded game: the engine's seed and board size, plus the action given on every tick, stored as runs of
+    (action, how many ticks in a row). Because the engine is deterministic, that's enough to play the game again.
+    """
+
+    def __init__(self, width, height, seed):
+        self.width = width
+        self.height = height
+        self.seed = seed
+        self.runs: List[List[int]] = []
+        self.tickCount = 0
+        # (score, highScore, head, length) at the end of the recording.
+        self.result: Tuple[int,int,int,int] = (0, 0, 0, 0)
+
+    def getActions(self):
+        """
+        Yields the action for each tick in order, with None for ticks where no turn was requested.
+        """
+        for code, count in self.runs:
+            action = None if code == NO_TURN else code
+            for _ in range(count): yield action
+
+    def toBytes(self):
+        data = bytearray(struct.pack(HEADER_FORMAT, MAGIC, VERSION, self.width, self.height,
+                                     self.seed, self.tickCount))
+        data += struct.pack(RESULT_FORMAT, *self.result)
+        for code, count in self.runs:
+            data.append(code)
+            writeVarint(data, count)
+        return bytes(data)
+
+    @staticmethod
+    def fromBytes(data: bytes):
+        magic, version, width, height, seed, tickCount = struct.unpack_from(HEADER_FORMAT, data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a version {VERSION} snake replay.")
+        replay = Replay(width, height, seed)
+        replay.tickCount = tickCount
+        offset = struct.calcsize(HEADER_FORMAT)
+        replay.result = struct.unpack_from(RESULT_FORMAT, data, offset)
+        offset += struct.calcsize(RESULT_FORMAT)
+        while offset < len(data):
+            code = data[offset]
+            count, offset = readVarint(data, offset + 1)
+            replay.runs.append([code, count])
+        return replay
+
+    def save(self, filePath):
+        with open(filePath, "wb") as replayFile: replayFile.write(self.toBytes())
+
+    @staticmethod
+    def load(filePath):
+        with open(filePath, "rb") as replayFile: return Replay.fromBytes(replayFile.read())
+
+
+class ReplayRecorder:
+    """
+    Records every action given to an engine, starting from the engine's current seed. Call record() with the
+    action for each tick, then finish() once the game is over.
+    """
+
+    def __init__(self, engine: SnakeEngine):
+        self.engine = engine
+        self.replay = Replay(engine.width, engine.height, engine.seed)
+
+    def record(self, action: Optional[int]):
+        code = NO_TURN if action is None else action
+        runs = self.replay.runs
+        if runs and runs[-1][0] == code: runs[-1][1] += 1
+        else: runs.append([code, 1])
+        self.replay.tickCount += 1
+
+    def finish(self):
+        self.replay.result = getResult(self.engine)
+        return self.replay
+
+
+def getResult(engine: SnakeEngine):
+    return (engine.score, engine.highScore, engine.head, len(engine.body))
+
+def runReplay(replay: Replay):
+    """
+    Plays a replay as fast as possible with no display, and returns the engine in its final state.
+    """
+    engine = makeEngine(replay.width, replay.height, replay.seed)
+    step = engine.step
+    for code, count in replay.runs:
+        if code == NO_TURN:
+            for _ in range(count): step()
+        else:
+            for _ in range(count): step(code)
+    return engine
+
+def verifyReplay(replay: Replay):
+    """
+    Returns True if playing the replay again ends the same way it did when it was recorded.
+    """
+    return getResult(runReplay(replay)) == tuple(replay.result)
+
+
+# Checks recorded games against the current rules, or plays one back on screen.
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Check or watch recorded snake games.")
+    parser.add_argument("replayFiles", nargs = "+", help = "The replay files to use.")
+    parser.add_argument("--watch", action = "store_true", help = "Play the first replay on screen.")
+    parser.add_argument("--speed", type = float, default = 1,
+                        help = "How many times faster than normal to play the replay when watching.")
+    arguments = parser.parse_args()
+
+    if arguments.watch:
+        # Only import pygame when we actually need to draw something.
+        from complex_pygame_snake_game import SnakeGame
+        SnakeGame(replay = Replay.load(arguments.replayFiles[0]), replaySpeed = arguments.speed).play()
+
+    else:
+        failures = 0
+        ticks = 0
+        startTime = time.perf_counter()
+        for replayFile in arguments.replayFiles:
+            replay = Replay.load(replayFile)
+            ticks += replay.tickCount
+            if not verifyReplay(replay):
+                failures += 1
+                print(f"MISMATCH: {replayFile}")
+        elapsedTime = time.perf_counter() - startTime
+        print(f"Checked {len(arguments.replayFiles)} replays ({ticks:,} ticks) in {elapsedTime:.2f} s. "
+              f"{failures} did not match.")
+        if failures > 0: raise SystemExit(1)
@@ -0,0 +1,323 @@
+import argparse, gc, os, random, sys, time, tracemalloc
+from typing import List, Optional
+
+# The soak test never shows a window, so pygame draws to a display that doesn't exist.
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+from snake_engine import SnakeEngine, makeEngine
+from snake_batch import POLICIES
+from snake_renderers import RENDERERS, Renderer
+from snake_benchmark import BenchmarkFinished, runTurtleGame
+from complex_pygame_snake_game import SnakeGame
+
+GAMES = ["pygame", "original_turtle", "revised_turtle", "engine"]
+
+
+def getRssBytes() -> Optional[int]:
+    """
+    Returns how much memory the process is using right now (its resident set size), or None if this computer
+    doesn't say. Only Linux is supported, through /proc.
+    """
+    try:
+        with open("/proc/self/statm") as statmFile: return int(statmFile.read().split()[1])*os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def getMedian(values):
+    values = sorted(values)
+    return values[len(values)//2]
+
+
+class SoakSample:
+    """
+    The memory use and speed of the game at one point in a soak test.
+    """
+
+    def __init__(self, tick, games, rssBytes, tracedBytes, tickMicroseconds):
+        self.tick = tick
+        self.games = games
+        self.rssBytes = rssBytes
+        self.tracedBytes = tracedBytes
+        # The average time per tick, including drawing, since the sample before.
+        self.tickMicroseconds = tickMicroseconds
+
+
+class SoakTest:
+    """
+    Plays one very long session, like a kiosk left running for days, and checks that memory use and tick times
+    stay flat. The session is played by one of the targets below, which calls recordTick() after every tick.
+
+    Every sampleEvery ticks, at the next game over, the garbage collector is run and a sample is taken. Waiting for
+    a game over means every sample is taken with the snake back at its starting length, so a long snake can't look
+    like a leak. If tracing is on, tracemalloc counts every block Python allocates, which is slower but can point
+    at the line of code doing the allocating.
+    """
+
+    # Growth below these amounts is treated as noise, however big it is compared to the starting amount.
+    minimumRssGrowthBytes = 4*1024*1024
+    minimumTracedGrowthBytes = 256*1024
+
+    def __init__(self, ticks, sampleEvery = 100_000, trace = True, memoryTolerance = 0.1, tickTimeTolerance = 0.5):
+        self.ticks = ticks
+        self.sampleEvery = sampleEvery
+        self.trace = trace
+        self.memoryTolerance = memoryTolerance
+        self.tickTimeTolerance = tickTimeTolerance
+        self.samples: List[SoakSample] = []
+        # tracemalloc snapshots from the first sample and the latest one, for finding where memory went.
+        self.firstSnapshot = None
+        self.lastSnapshot = None
+        self.ticksPlayed = 0
+        self.games = 0
+        self.nextSampleTick = sampleEvery
+        self.lastSampleTick = 0
+        self.lastSampleTime = None
+
+    def takeSample(self, tick, tickMicroseconds):
+        gc.collect()
+        tracedBytes = None
+        if self.trace:
+            tracedBytes = tracemalloc.get_traced_memory()[0]
+            self.lastSnapshot = tracemalloc.take_snapshot()
+            if self.firstSnapshot is None: self.firstSnapshot = self.lastSnapshot
+        self.samples.append(SoakSample(tick, self.games, getRssBytes(), tracedBytes, tickMicroseconds))
+
+    def run(self, target):
+        """
+        Has the target play until every tick has been played or its window is closed. Returns the ticks played.
+        """
+        if self.trace: tracemalloc.start()
+        self.lastSampleTime = time.perf_counter()
+        try: target.run(self)
+        finally:
+            if self.trace: tracemalloc.stop()
+        return self.ticksPlayed
+
+    def recordTick(self, gameOver):
+        """
+        Called after every tick. Takes a sample if one is due, and returns True once every tick has been played.
+        """
+        self.ticksPlayed += 1
+        tick = self.ticksPlayed
+        if gameOver: self.games += 1
+        # If a game goes on for a whole extra interval, sample anyway rather than never sampling again.
+        if (gameOver and tick >= self.nextSampleTick) or tick >= self.nextSampleTick + self.sampleEvery:
+            tickMicroseconds = (time.perf_counter() - self.lastSampleTime)/(tick - self.lastSampleTick)*1e6
+            self.takeSample(tick, tickMicroseconds)
+            self.nextSampleTick = tick + self.sampleEvery
+            self.lastSampleTick = tick
+            # Sampling is slow, so its time isn't counted as part of the next interval.
+            self.lastSampleTime = time.perf_counter()
+        return tick >= self.ticks
+
+    def getGrowth(self, values):
+        """
+        Compares the middle value of the last third of the samples to that of the first third. The first sample
+        is left out, since caches and pools are still filling up then.
+        """
+        values = values[1:]
+        third = len(values)//3
+        return getMedian(values[:third]), getMedian(values[-third:])
+
+    def getProblems(self):
+        """
+        Returns a description of every measurement that kept rising, or an empty list if the test passed.
+        """
+        problems = []
+        if len(self.samples) < 4:
+            return [f"Only {len(self.samples)} samples were taken, which isn't enough to see a trend. "
+                    "Run more ticks or sample more often."]
+        checks = [("Traced memory", [sample.tracedBytes for sample in self.samples], self.memoryTolerance,
+                   SoakTest.minimumTracedGrowthBytes, "bytes"),
+                  ("RSS", [sample.rssBytes for sample in self.samples], self.memoryTolerance,
+                   SoakTest.minimumRssGrowthBytes, "bytes"),
+                  ("Tick time", [sample.tickMicroseconds for sample in self.samples], self.tickTimeTolerance,
+                   0, "us")]
+        for name, values, tolerance, minimumGrowth, unit in checks:
+            if values[0] is None: continue
+            start, end = self.getGrowth(values)
+            if end - start > max(start*tolerance, minimumGrowth):
+                problems.append(f"{name} rose from {start:,.0f} {unit} to {end:,.0f} {unit} "
+                                f"({(end/start - 1)*100:+.0f}%).")
+        return problems
+
+    def getTopGrowth(self, count = 5):
+        """
+        Returns the lines of code whose allocations grew the most between the first and last samples.
+        """
+        if self.firstSnapshot is None or self.lastSnapshot is self.firstSnapshot: return []
+        # The soak test's own samples grow by design, so they are left out along with tracemalloc itself.
+        ignored = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        lastSnapshot = self.lastSnapshot.filter_traces(ignored)
+        differences = lastSnapshot.compare_to(self.firstSnapshot.filter_traces(ignored), "lineno")
+        return [difference for difference in differences[:count] if difference.size_diff > 0]
+
+
+class GameTarget:
+    """
+    Plays the real SnakeGame, one tick per frame with no waiting, so the score, the tail, dirty rendering and the
+    sprite atlas are all part of the test. The policy's turns are pressed as keys, so they go through the same events
+    and turn queue as a player's, unless the game has an autopilot steering it.
+    """
+
+    # The key for each direction code, the other way around from SnakeGame.keyDirections.
+    directionKeys = {int(direction): key for key, direction in SnakeGame.keyDirections.items()}
+
+    def __init__(self, game: SnakeGame, policy, rng: random.Random):
+        self.game = game
+        self.policy = policy
+        self.rng = rng
+
+    def run(self, soakTest: SoakTest):
+        game = self.game
+        game.start()
+        while game.running:
+            if game.autopilot is None:
+                direction = self.policy(game.engine, self.rng)
+                if direction is not None:
+                    pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key = GameTarget.directionKeys[direction]))
+            if soakTest.recordTick(game.runFrame(1)): return
+
+    def close(self):
+        self.game.finish()
+
+    def getReport(self):
+        return self.game.renderer.getReport()
+
+
+class TurtleTarget:
+    """
+    Plays one of the turtle versions with the benchmark's stand-in turtles, so no window is needed. The game's own
+    loop, tail and pool of segment turtles are all real, only the drawing is left out. The snake heads for the food,
+    but turns a random way about one tick in ten, so it dies now and then.
+    """
+
+    def __init__(self, implementation, rng: random.Random):
+        self.implementation = implementation
+        self.rng = rng
+        self.soakTest = None
+        self.namespace = None
+
+    def run(self, soakTest: SoakTest):
+        self.soakTest = soakTest
+        runTurtleGame(self.implementation, self.onFrame)
+
+    def onFrame(self, namespace, screen):
+        head = namespace["head"]
+        # Each frame plays one tick, so the tick before this frame is counted now. The game stops the snake when it
+        # dies, and the first frame is before any tick at all.
+        if self.namespace is None: self.namespace = namespace
+        elif self.soakTest.recordTick(head.direction == "stop"): raise BenchmarkFinished()
+        screen.keyHandlers[self.chooseKey(head, namespace["food"])]()
+
+    def chooseKey(self, head, food):
+        if self.rng.random() < 0.1: return self.rng.choice("wsda")
+        dx = food.xcor() - head.xcor()
+        dy = food.ycor() - head.ycor()
+        if abs(dx) >= abs(dy): return "d" if dx > 0 else "a"
+        return "w" if dy > 0 else "s"
+
+    def close(self):
+        pass
+
+    def getReport(self):
+        if self.namespace is None: return f"The {self.implementation} game didn't start."
+        return (f"The {self.implementation} game ended with {len(self.namespace['segments'])} segment turtles in use "
+                f"and {len(self.namespace['segment_pool'])} in the pool.")
+
+
+class EngineTarget:
+    """
+    Plays the engine on its own with a policy, and draws it with a renderer, for checking the rules and the
+    renderers apart from the rest of the game.
+    """
+
+    def __init__(self, engine: SnakeEngine, policy, renderer: Renderer, rng: random.Random):
+        self.engine = engine
+        self.policy = policy
+        self.renderer = renderer
+        self.rng = rng
+
+    def run(self, soakTest: SoakTest):
+        engine = self.engine
+        policy = self.policy
+        rng = self.rng
+        render = self.renderer.render
+        recordTick = soakTest.recordTick
+        while True:
+            state, reward, gameOver = engine.step(policy(engine, rng))
+            render(engine)
+            if recordTick(gameOver) or not self.renderer.open: return
+
+    def close(self):
+        self.renderer.close()
+
+    def getReport(self):
+        return self.renderer.getReport()
+
+
+# Plays millions of ticks and fails if memory use or tick times keep rising, so leaks are found before deploying.
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Soak-test the snake game for memory leaks and slowdowns.")
+    parser.add_argument("--ticks", type = int, default = 2_000_000, help = "How many ticks to play.")
+    parser.add_argument("--sample-every", type = int, default = 100_000, metavar = "TICKS",
+                        help = "How often to sample memory use and tick times.")
+    parser.add_argument("--game", choices = GAMES, default = "pygame",
+                        help = "Which version of the game to play. The turtle versions have their own board and "
+                               "steering, and engine plays the rules on their own.")
+    parser.add_argument("--policy", choices = POLICIES, default = "greedy", help = "How the snake picks its moves.")
+    parser.add_argument("--autopilot", nargs = "?", type = int, const = 2000, metavar = "BUDGET",
+                        help = "Let the pygame game's autopilot steer instead of pressing keys for the policy.")
+    parser.add_argument("--dirty-rendering", action = "store_true",
+                        help = "Only redraw the parts of the pygame game's screen that changed each frame.")
+    parser.add_argument("--renderer", choices = RENDERERS,
+                        help = "How to draw the pygame game or the engine. By default the pygame game is drawn with "
+                               "pygame and the engine isn't drawn.")
+    parser.add_argument("--render-every", type = int, default = 1, metavar = "N", help = "Only draw every Nth tick.")
+    parser.add_argument("--width", type = int, default = 30, help = "The board width, in cells.")
+    parser.add_argument("--height", type = int, default = 30, help = "The board height, in cells.")
+    parser.add_argument("--seed", type = int, default = 0, help = "The seed for the game and the policy.")
+    parser.add_argument("--no-trace", action = "store_true",
+                        help = "Don't use tracemalloc. Ticks are faster, but only RSS is checked.")
+    parser.add_argument("--memory-tolerance", type = float, default = 0.1,
+                        help = "How much memory may grow, as a fraction, before the test fails.")
+    parser.add_argument("--tick-time-tolerance", type = float, default = 0.5,
+                        help = "How much the time per tick may grow, as a fraction, before the test fails.")
+    arguments = parser.parse_args()
+
+    rng = random.Random(arguments.seed)
+    if arguments.game == "pygame":
+        game = SnakeGame(seed = arguments.seed, dirtyRendering = arguments.dirty_rendering, width = arguments.width,
+                         height = arguments.height, autopilotBudget = arguments.autopilot,
+                         renderer = arguments.renderer or "pygame", renderEvery = arguments.render_every)
+        target = GameTarget(game, POLICIES[arguments.policy], rng)
+    elif arguments.game == "engine":
+        engine = makeEngine(arguments.width, arguments.height, arguments.seed)
+        renderer = RENDERERS[arguments.renderer or "null"](arguments.width, arguments.height, arguments.render_every)
+        target = EngineTarget(engine, POLICIES[arguments.policy], renderer, rng)
+    else:
+        # The turtle versions place their food with the random module.
+        random.seed(arguments.seed)
+        target = TurtleTarget(arguments.game, rng)
+    soakTest = SoakTest(arguments.ticks, arguments.sample_every, not arguments.no_trace, arguments.memory_tolerance,
+                        arguments.tick_time_tolerance)
+    startTime = time.perf_counter()
+    ticks = soakTest.run(target)
+    elapsedTime = time.perf_counter() - startTime
+    target.close()
+
+    print(f"{'tick':>12} {'games':>9} {'RSS MB':>9} {'traced MB':>10} {'us/tick':>9}")
+    for sample in soakTest.samples:
+        rss = "-" if sample.rssBytes is None else f"{sample.rssBytes/1e6:.1f}"
+        traced = "-" if sample.tracedBytes is None else f"{sample.tracedBytes/1e6:.3f}"
+        print(f"{sample.tick:>12,} {sample.games:>9,} {rss:>9} {traced:>10} {sample.tickMicroseconds:>9.2f}")
+    print(f"Played {ticks:,} ticks and {soakTest.games:,} games "
+          f"in {elapsedTime:.1f} s.")
+    print(target.getReport())
+    for difference in soakTest.getTopGrowth(): print(f"  grew: {difference}")
+
+    problems = soakTest.getProblems()
+    for problem in problems: print(f"FAIL: {problem}")
+    if problems: sys.exit(1)
+    print("PASS: memory use and tick times stayed flat.")
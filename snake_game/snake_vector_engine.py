@@ -0,0 +1,208 @@
+import time
+import numpy as np
+from snake_engine import UP, LEFT, STOPPED, DIRECTION_DELTAS, OPPOSITE_DIRECTIONS
+
+# Any action outside UP..LEFT means "keep going the same way", like passing None to SnakeEngine.step.
+NO_TURN = -1
+
+# The same table as snake_engine, as an array so it can be looked up for every board at once. Cells, positions and
+# directions are all stored as np.intp, the type NumPy uses for indexes, so they never have to be converted before
+# being used to look something up.
+# STOPPED has no opposite, so it gets a code that no action can match.
+OPPOSITE = np.array([STOPPED + 1 if direction is None else direction for direction in OPPOSITE_DIRECTIONS],
+                    dtype = np.intp)
+
+
+class VectorSnakeEngine:
+    """
+    Many snake games played side by side, with the state of every board kept in NumPy arrays so that one call to
+    step() moves every snake at once. The rules match SnakeEngine, including restarting a board as soon as its game
+    ends, but the food is placed with NumPy's random numbers, so the games are not the same as SnakeEngine's for a
+    given seed.
+
+    Every array has one entry per board, except for occupied and body, which are boardCount*width*height long:
+    board n uses entries n*width*height up to (n+1)*width*height. Keeping them flat means every lookup is a single
+    index instead of a (board, cell) pair.
+    """
+
+    # How many random cells to try when placing food before searching the board for a free one.
+    foodAttempts = 8
+
+    def __init__(self, boardCount, width = 20, height = 20, seed = None):
+        self.boardCount = boardCount
+        self.width = width
+        self.height = height
+        self.cellCount = width*height
+        self.random = np.random.default_rng(seed)
+        # Where each board's cells start in the flat arrays.
+        self.offsets = np.arange(boardCount, dtype = np.intp)*self.cellCount
+        self.center = (height//2)*width + width//2
+        # The cell a head moves into from each cell in each direction, or -1 if that would leave the board, stored
+        # as nextCells[direction*cellCount + cell]. A stopped head stays where it is. One lookup in this table
+        # replaces working out x and y and checking them against all four walls.
+        self.nextCells = np.empty(len(DIRECTION_DELTAS)*self.cellCount, dtype = np.intp)
+        cells = np.arange(self.cellCount, dtype = np.intp)
+        cellX = cells % width
+        cellY = cells // width
+        for direction, (dx, dy) in enumerate(DIRECTION_DELTAS):
+            x = cellX + dx
+            y = cellY + dy
+            onBoard = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+            self.nextCells[direction*self.cellCount:(direction+1)*self.cellCount] = np.where(onBoard, y*width + x, -1)
+
+        self.occupied = np.zeros(boardCount*self.cellCount, dtype = np.uint8)
+        # Each board's body is a ring buffer of cells: bodyStart is where the head is, and the next length-1
+        # entries (wrapping around) are the tail. Moving writes the new head just before bodyStart instead of
+        # shifting the whole snake.
+        self.body = np.zeros(boardCount*self.cellCount, dtype = np.intp)
+        self.bodyStart = np.zeros(boardCount, dtype = np.intp)
+        self.length = np.ones(boardCount, dtype = np.intp)
+        self.head = np.full(boardCount, self.center, dtype = np.intp)
+        self.direction = np.full(boardCount, STOPPED, dtype = np.intp)
+        self.growing = np.zeros(boardCount, dtype = bool)
+        self.score = np.zeros(boardCount, dtype = np.int32)
+        self.highScore = np.zeros(boardCount, dtype = np.int32)
+        # The score each board had when its last game ended.
+        self.finalScore = np.zeros(boardCount, dtype = np.int32)
+        self.food = np.zeros(boardCount, dtype = np.intp)
+
+        self.body[self.offsets] = self.center
+        self.occupied[self.offsets + self.center] = 1
+        self.placeFood(np.arange(boardCount))
+
+    def placeFood(self, boards):
+        """
+        Moves the food on the given boards to random cells the snake isn't on, or to -1 if a board is full.
+        Random cells are tried first, which almost always works. Only boards where every try landed on the snake
+        have their free cells listed.
+        """
+        food = self.random.integers(0, self.cellCount, size = len(boards), dtype = np.intp)
+        for _ in range(VectorSnakeEngine.foodAttempts):
+            blocked = np.flatnonzero(self.occupied[self.offsets[boards] + food])
+            if len(blocked) == 0: break
+            food[blocked] = self.random.integers(0, self.cellCount, size = len(blocked), dtype = np.intp)
+        else:
+            boardCells = self.occupied.reshape(self.boardCount, self.cellCount)
+            for index in np.flatnonzero(self.occupied[self.offsets[boards] + food]):
+                freeCells = np.flatnonzero(boardCells[boards[index]] == 0)
+                food[index] = self.random.choice(freeCells) if len(freeCells) > 0 else -1
+        self.food[boards] = food
+
+    def restart(self, boards):
+        """
+        Puts the snakes on the given boards back in the middle, like SnakeEngine.restart. The high scores and food
+        positions are kept, except where the food is under the new snake or missing.
+        """
+        self.occupied.reshape(self.boardCount, self.cellCount)[boards] = 0
+        offsets = self.offsets[boards]
+        self.occupied[offsets + self.center] = 1
+        self.body[offsets] = self.center
+        self.bodyStart[boards] = 0
+        self.length[boards] = 1
+        self.head[boards] = self.center
+        self.direction[boards] = STOPPED
+        self.growing[boards] = False
+        self.score[boards] = 0
+        food = self.food[boards]
+        # A board with no food (-1) would index the cell before its own, but it is picked by the first test anyway.
+        needsFood = (food == -1) | (self.occupied[offsets + food] == 1)
+        if needsFood.any(): self.placeFood(boards[needsFood])
+
+    def step(self, actions):
+        """
+        Advances every board by one tick. actions holds a direction code for each board, or NO_TURN.
+        Returns the reward for each board (1 for eating food, -1 for a game over, 0 otherwise) and whether each
+        board's game ended on this tick. Boards whose game ended have already been restarted.
+        """
+        actions = np.asarray(actions)
+        offsets = self.offsets
+        cellCount = self.cellCount
+
+        # Turn, unless the action isn't a direction or would reverse the snake.
+        turning = (actions >= UP) & (actions <= LEFT) & (actions != OPPOSITE[self.direction])
+        direction = np.where(turning, actions, self.direction)
+        self.direction = direction
+
+        head = self.head
+        nextCell = self.nextCells[direction*cellCount + head]
+        outOfBounds = nextCell < 0
+        # A stopped snake's next cell is its head, so it never counts as moving onto the board.
+        inBounds = ~outOfBounds & (direction != STOPPED)
+        newHead = np.where(outOfBounds, head, nextCell)
+
+        # The tail moves out of its last cell before the head moves in. Growing just skips this step.
+        # Wrapping around the ring buffer with np.where is about twice as fast as using %.
+        tailIndex = self.bodyStart + self.length - 1
+        tailIndex = np.where(tailIndex >= cellCount, tailIndex - cellCount, tailIndex)
+        popping = inBounds & ~self.growing
+        # Every board's tail cell is covered, so writing whether it stays covered only clears the cells that the
+        # tails move out of. A plain write is much faster than reading the cells, changing them and writing back.
+        self.occupied[offsets + self.body[offsets + tailIndex]] = (~popping).view(np.uint8)
+        grew = inBounds & self.growing
+        self.growing &= ~inBounds
+
+        headIndex = offsets + newHead
+        hitSelf = inBounds & self.occupied[headIndex].view(bool)
+        gameOver = outOfBounds | hitSelf
+        alive = inBounds & ~hitSelf
+
+        # Push the new head onto the front of each moving snake's ring buffer.
+        bodyStart = self.bodyStart - alive
+        self.bodyStart = np.where(bodyStart < 0, cellCount - 1, bodyStart)
+        self.body[offsets + self.bodyStart] = newHead
+        # Every board's new head cell ends up covered: the snakes that moved cover it now, and for the rest it is
+        # the cell they were already on or the part of the tail they ran into.
+        self.occupied[headIndex] = 1
+        self.length += grew & alive
+        self.head = newHead
+
+        rewards = np.zeros(self.boardCount, dtype = np.int8)
+        eating = np.flatnonzero(alive & (newHead == self.food))
+        if len(eating) > 0:
+            self.score[eating] += 1
+            np.maximum(self.highScore, self.score, out = self.highScore)
+            self.growing[eating] = True
+            rewards[eating] = 1
+            self.placeFood(eating)
+
+        finished = np.flatnonzero(gameOver)
+        if len(finished) > 0:
+            self.finalScore[finished] = self.score[finished]
+            rewards[finished] = -1
+            self.restart(finished)
+
+        return rewards, gameOver
+
+    @property
+    def headX(self):
+        """
+        The x coordinate of each board's head, worked out from head when it is asked for so step() doesn't have to
+        keep it up to date.
+        """
+        return self.head % self.width
+
+    @property
+    def headY(self):
+        return self.head // self.width
+
+    def getBody(self, board):
+        """
+        Returns the cells covered by one board's snake, starting with the head, like SnakeEngine.body.
+        """
+        indices = (self.bodyStart[board] + np.arange(self.length[board])) % self.cellCount
+        return self.body[self.offsets[board] + indices]
+
+
+# Steps thousands of boards with random turns to show how many board-steps per second NumPy can manage.
+if __name__ == "__main__":
+    boardCount = 10_000
+    engine = VectorSnakeEngine(boardCount, 20, 20, seed = 0)
+    random = np.random.default_rng(1)
+    # Each board turns a random way about one tick in four.
+    actions = random.integers(0, 16, size = (64, boardCount), dtype = np.int8)
+    actions[actions > LEFT] = NO_TURN
+    ticks = 500
+    startTime = time.perf_counter()
+    for tick in range(ticks): engine.step(actions[tick % 64])
+    elapsedTime = time.perf_counter() - startTime
+    print(f"{boardCount*ticks/elapsedTime:,.0f} board-steps/sec ({boardCount:,} boards, {ticks} ticks)")